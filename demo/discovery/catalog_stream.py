@@ -0,0 +1,114 @@
+"""
+Append-only NDJSON catalog written while discovery results arrive.
+
+CohortDiscoveryController appends each accepted cohort document to
+<catalog>.partial.ndjson as soon as it arrives, one flushed and fsynced line
+per site. Nothing is held in server memory, early arrivals are durable, and
+downstream tools can already read the partial file (import_csv.py takes
+.ndjson input). At the end of the run finalize() renames it to
+<catalog>.ndjson and writes the <catalog>.json array from it, each via a
+temporary file and os.replace, so readers never see a half-written catalog.
+publish() does the same mid-run without closing the stream, e.g. when a
+discovery deadline passes before every site has answered.
+
+A partial file left behind by a crashed run is not overwritten: open() moves
+it aside to <catalog>.partial.<time of its last write>.ndjson.
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+def iter_catalog(path: str) -> Iterator[Dict[str, Any]]:
+    """Cohort documents of an NDJSON catalog; a torn last line (crash mid-write) is skipped."""
+    with open(path, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+class CatalogStream:
+    """NDJSON catalog that is appended to per result and finalized atomically."""
+
+    def __init__(self, json_path: str):
+        base = json_path[:-len(".json")] if json_path.endswith(".json") else json_path
+        self.json_path = json_path
+        self.ndjson_path = f"{base}.ndjson"
+        self.partial_path = f"{base}.partial.ndjson"
+        self.count = 0
+        self._file = None
+
+    def open(self) -> Optional[str]:
+        """
+        Start a new catalog. The partial file of an earlier, interrupted run is
+        kept under a timestamped name, which is returned (None if there was none).
+        """
+        os.makedirs(os.path.dirname(self.partial_path) or ".", exist_ok=True)
+        rotated = None
+        if os.path.exists(self.partial_path) and os.path.getsize(self.partial_path) > 0:
+            written = datetime.fromtimestamp(os.path.getmtime(self.partial_path))
+            rotated = f"{self.partial_path[:-len('.ndjson')]}.{written:%Y%m%d-%H%M%S}.ndjson"
+            os.replace(self.partial_path, rotated)
+        self._file = open(self.partial_path, "w")
+        self.count = 0
+        return rotated
+
+    def append(self, document: Dict[str, Any]):
+        if self._file is None:
+            self.open()
+        self._file.write(json.dumps(document, default=str) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.count += 1
+
+    def _write_ndjson(self, extra: List[Dict[str, Any]]):
+        tmp_path = f"{self.ndjson_path}.tmp"
+        with open(tmp_path, "w") as out:
+            with open(self.partial_path, "r") as f:
+                shutil.copyfileobj(f, out)
+            for document in extra:
+                out.write(json.dumps(document, default=str) + "\n")
+        os.replace(tmp_path, self.ndjson_path)
+
+    def _write_json(self):
+        # Stream the JSON array so the catalog is never loaded as a whole
+        tmp_path = f"{self.json_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("[")
+            count = 0
+            for count, document in enumerate(iter_catalog(self.ndjson_path), 1):
+                f.write(",\n" if count > 1 else "\n")
+                f.write(json.dumps(document, indent=2, default=str))
+            f.write("\n]\n" if count else "]\n")
+        os.replace(tmp_path, self.json_path)
+
+    def publish(self, extra: Iterable[Dict[str, Any]] = ()):
+        """
+        Publish the results so far, plus extra documents (e.g. fallbacks for
+        sites that have not answered), as the NDJSON and JSON catalogs;
+        appending continues afterwards.
+        """
+        if self._file is None:
+            self.open()
+        self._file.flush()
+        self._write_ndjson(list(extra))
+        self._write_json()
+
+    def finalize(self, extra: Iterable[Dict[str, Any]] = ()) -> Optional[str]:
+        """Publish the NDJSON and JSON catalogs for good; returns the NDJSON path (None if never opened)."""
+        if self._file is None:
+            return None
+        self._file.close()
+        self._file = None
+        extra = list(extra)
+        if extra:
+            self._write_ndjson(extra)
+            os.remove(self.partial_path)
+        else:
+            os.replace(self.partial_path, self.ndjson_path)
+        self._write_json()
+        return self.ndjson_path
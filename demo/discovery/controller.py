@@ -3,7 +3,12 @@ Controller for federated cohort discovery.
 
 This orchestrates the collection of cohort metadata from multiple biobank sites.
 """
-from typing import Dict, List
+import json
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from nvflare.apis.client import Client
 from nvflare.apis.controller_spec import ClientTask, Task
@@ -14,6 +19,11 @@ from nvflare.apis.impl.controller import Controller
 from nvflare.apis.shareable import Shareable
 from nvflare.apis.signal import Signal
 
+from catalog_stream import CatalogStream
+from executor import TELEMETRY_META_KEY
+from last_known import LastKnownStore
+from run_report import build_run_report
+
 
 class CohortDiscoveryController(Controller):
     """
@@ -21,39 +31,93 @@ class CohortDiscoveryController(Controller):
     
     This is NOT a federated statistics controller - it simply collects
     cohort metadata from each site without computing global statistics.
+    
+    Each accepted result is appended to <output_path stem>.partial.ndjson
+    when it arrives; stop_controller publishes <stem>.ndjson and output_path
+    atomically. Only the number of results is kept in memory.
+    
+    With deadline_seconds set, the round is not held up by stragglers: when
+    the deadline passes the catalog is published with the sites that answered,
+    and every missing or failed site is filled in from its last successful
+    metadata (marked with its age, see last_known.py). The controller then
+    keeps accepting late results for up to late_result_seconds, re-publishing
+    the catalog as each one replaces its site's fallback.
     """
     
     def __init__(
         self,
         output_path: str = "cohort_catalog.json",
         min_clients: int = 1,
-        wait_time_after_min_received: int = 1
+        wait_time_after_min_received: int = 1,
+        report_path: Optional[str] = None,
+        deadline_seconds: Optional[int] = None,
+        late_result_seconds: int = 0,
+        last_known_dir: Optional[str] = None
     ):
         """
         Args:
             output_path: Where to save collected cohort metadata
             min_clients: Minimum number of clients to wait for
             wait_time_after_min_received: Seconds to wait after min clients respond
+            report_path: Where to save the run's performance report (defaults
+                to <output_path stem>.performance.json)
+            deadline_seconds: Publish the catalog after this many seconds even
+                if sites are missing, using their last-known metadata
+            late_result_seconds: After the deadline, how long to keep merging
+                late results into the published catalog
+            last_known_dir: Where each site's last successful metadata is kept
+                (defaults to <output_path stem>.last-known in the workspace)
         """
         super().__init__()
         self.output_path = output_path
         self.min_clients = min_clients
         self.wait_time_after_min_received = wait_time_after_min_received
-        self.cohort_metadata: List[Dict] = []
+        self.report_path = report_path or f"{output_path.rsplit('.json', 1)[0]}.performance.json"
+        self.deadline_seconds = deadline_seconds
+        self.late_result_seconds = late_result_seconds
+        self.last_known_dir = last_known_dir
+        self.catalog: Optional[CatalogStream] = None
+        self.last_known: Optional[LastKnownStore] = None
+        self.results_received = 0
+        # Sites whose current-round metadata is in the catalog / that failed / expected to answer
+        self.responded: set = set()
+        self.failed: set = set()
+        self.expected_sites: set = set()
+        self._deadline_passed = False
+        self._unknown_sites_logged: set = set()
+        self._lock = threading.Lock()
+        # Per-result timing and site telemetry for the performance report
+        self.site_results: List[Dict[str, Any]] = []
+        self.started_at: Optional[str] = None
+        self._broadcast_time: Optional[float] = None
+        self._time_to_min_responses: Optional[float] = None
     
     def start_controller(self, fl_ctx: FLContext):
         """Called when controller starts."""
-        self.log_info(fl_ctx, "Cohort Discovery Controller started")
+        workspace = Path(fl_ctx.get_engine().get_workspace().get_root_dir())
+        self.catalog = CatalogStream(str(workspace / self.output_path))
+        rotated = self.catalog.open()
+        if rotated:
+            self.log_warning(fl_ctx, f"Results of an interrupted earlier run kept in {rotated}")
+        self.last_known = LastKnownStore(
+            self.last_known_dir or str(workspace / f"{self.output_path.rsplit('.json', 1)[0]}.last-known")
+        )
+        self.log_info(fl_ctx, f"Cohort Discovery Controller started, streaming results to {self.catalog.partial_path}")
     
     def control_flow(self, abort_signal: Signal, fl_ctx: FLContext):
         """Main control flow - request cohort metadata from all sites."""
         self.log_info(fl_ctx, "Requesting cohort metadata from all sites...")
         
-        # Create task
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self._broadcast_time = time.monotonic()
+        self.expected_sites = {client.name for client in fl_ctx.get_engine().get_clients()}
+        
+        # Create task; with a deadline it times out instead of waiting for stragglers
         task = Task(
             name="extract_cohort_metadata",
             data=Shareable(),
-            result_received_cb=self._result_callback
+            result_received_cb=self._result_callback,
+            timeout=self.deadline_seconds or 0
         )
         
         # Broadcast to all clients
@@ -68,38 +132,131 @@ class CohortDiscoveryController(Controller):
         
         self.log_info(
             fl_ctx,
-            f"Received cohort metadata from {len(self.cohort_metadata)} sites"
+            f"Received cohort metadata from {self.results_received} sites"
         )
+        
+        if self.deadline_seconds and self._missing_sites():
+            self._publish_at_deadline(abort_signal, fl_ctx)
     
-    def stop_controller(self, fl_ctx: FLContext):
-        """Called when controller stops - save collected metadata."""
-        import json
-        from pathlib import Path
+    def _missing_sites(self) -> List[str]:
+        return sorted(self.expected_sites - self.responded)
+    
+    def _outstanding_sites(self) -> List[str]:
+        """Sites that have neither answered nor failed yet."""
+        return sorted(self.expected_sites - self.responded - self.failed)
+    
+    def _fallbacks(self, fl_ctx: FLContext) -> List[Dict]:
+        """Last-known documents of the sites without current-round metadata."""
+        fallbacks = []
+        for site in self._missing_sites():
+            document = self.last_known.fallback(site)
+            if document is None:
+                if site not in self._unknown_sites_logged:
+                    self._unknown_sites_logged.add(site)
+                    self.log_warning(fl_ctx, f"No current or last-known cohort metadata for {site}")
+            else:
+                fallbacks.append(document)
+        return fallbacks
+    
+    def _publish_at_deadline(self, abort_signal: Signal, fl_ctx: FLContext):
+        """
+        Publish with fallbacks, then merge late results for up to
+        late_result_seconds while sites are still outstanding. If every site
+        already answered or failed there is nothing to wait for.
+        """
+        with self._lock:
+            self._deadline_passed = True
+            fallbacks = self._fallbacks(fl_ctx)
+            self.catalog.publish(fallbacks)
+            outstanding = self._outstanding_sites()
+        published = f"catalog published with {len(fallbacks)} last-known entries"
+        if not outstanding:
+            self.log_warning(
+                fl_ctx,
+                f"All sites have answered, {', '.join(sorted(self.failed))} failed; {published}"
+            )
+            return
+        elapsed = time.monotonic() - self._broadcast_time
+        trigger = (
+            f"Deadline of {self.deadline_seconds}s passed" if elapsed >= self.deadline_seconds
+            else f"Stopped waiting after {self.results_received} responses"
+        )
+        self.log_warning(fl_ctx, f"{trigger} without {', '.join(outstanding)}; {published}")
         
-        output_file = Path(fl_ctx.get_engine().get_workspace().get_root_dir()) / self.output_path
+        waited_until = time.monotonic() + self.late_result_seconds
+        while self._outstanding_sites() and time.monotonic() < waited_until and not abort_signal.triggered:
+            time.sleep(0.5)
+    
+    def stop_controller(self, fl_ctx: FLContext):
+        """Called when controller stops - publish the collected catalog."""
+        workspace = Path(fl_ctx.get_engine().get_workspace().get_root_dir())
+        output_file = workspace / self.output_path
         output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_file, 'w') as f:
-            json.dump(self.cohort_metadata, f, indent=2)
+        with self._lock:
+            fallbacks = self._fallbacks(fl_ctx) if self.deadline_seconds else []
+            ndjson_path = self.catalog.finalize(fallbacks) if self.catalog else None
+        if ndjson_path:
+            self.log_info(fl_ctx, f"Cohort catalog saved to {output_file} and {ndjson_path}")
+        else:
+            self.log_warning(fl_ctx, "No cohort catalog to save")
+        
+        report = build_run_report(
+            self.site_results, self.min_clients, self.started_at, self._time_to_min_responses,
+            self._missing_sites()
+        )
+        # Like output_path, report_path is relative to the workspace
+        report_file = workspace / self.report_path
+        report_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(report_file, 'w') as f:
+            json.dump(report, f, indent=2)
         
-        self.log_info(fl_ctx, f"Cohort catalog saved to {output_file}")
+        latency = report["latency_seconds"]
+        summary = (
+            f" (p50 {latency['p50']}s, max {latency['max']}s, "
+            f"slowest: {', '.join(site['site'] for site in report['slowest_sites'])})"
+            if report["sites_ok"] else ""
+        )
+        self.log_info(fl_ctx, f"Performance report saved to {report_file}{summary}")
     
     def _result_callback(self, client_task: ClientTask, fl_ctx: FLContext):
         """Handle result from a client."""
-        client_name = client_task.client.name
-        result = client_task.result
+        self._accept_result(client_task.client.name, client_task.result, fl_ctx)
+    
+    def _accept_result(self, client_name: str, result: Shareable, fl_ctx: FLContext, late: bool = False):
         rc = result.get_return_code()
+        latency = time.monotonic() - self._broadcast_time if self._broadcast_time else 0.0
+        record = {"site": client_name, "status": str(rc), "latency_seconds": round(latency, 3), "telemetry": None}
+        if late:
+            record["late"] = True
+        self.site_results.append(record)
         
         if rc == ReturnCode.OK:
             dxo = from_shareable(result)
             cohort_data = dxo.data
-            self.cohort_metadata.append(cohort_data)
+            record["telemetry"] = dxo.get_meta_prop(TELEMETRY_META_KEY)
+            with self._lock:
+                if client_name in self.responded:
+                    self.log_warning(fl_ctx, f"Ignoring duplicate cohort metadata from {client_name}")
+                    return
+                # Durable before it is acknowledged in the log
+                self.catalog.append(cohort_data)
+                self.results_received += 1
+                self.responded.add(client_name)
+                self.last_known.save(client_name, cohort_data)
+                if self._deadline_passed:
+                    # Replace the site's fallback in the published catalog
+                    self.catalog.publish(self._fallbacks(fl_ctx))
+            if self._time_to_min_responses is None and self.results_received >= self.min_clients:
+                self._time_to_min_responses = latency
             self.log_info(
                 fl_ctx,
-                f"Received cohort metadata from {client_name}: "
-                f"{cohort_data.get('cohort_name', 'Unknown')}"
+                f"Received {'late ' if late else ''}cohort metadata from {client_name}: "
+                f"{cohort_data.get('cohort_name', 'Unknown')} after {latency:.2f}s"
             )
         else:
+            with self._lock:
+                self.failed.add(client_name)
             self.log_error(
                 fl_ctx,
                 f"Failed to get cohort metadata from {client_name}: {rc}"
@@ -113,6 +270,9 @@ class CohortDiscoveryController(Controller):
         result: Shareable,
         fl_ctx: FLContext
     ):
-        """Handle unknown task results."""
+        """Handle unknown task results (including results that arrive after the deadline)."""
+        if task_name == "extract_cohort_metadata" and self._deadline_passed:
+            self._accept_result(client.name, result, fl_ctx, late=True)
+            return
         self.log_warning(fl_ctx, f"Received unknown task: {task_name}")
 
@@ -3,11 +3,11 @@ Executor for extracting cohort metadata at each biobank site.
 
 This runs on the client side to extract and return cohort metadata.
 """
-import csv
-import random
-from collections import Counter
+import resource
+import sys
+import time
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 from nvflare.apis.dxo import DXO, DataKind
 from nvflare.apis.executor import Executor
@@ -16,6 +16,20 @@ from nvflare.apis.fl_context import FLContext
 from nvflare.apis.shareable import Shareable
 from nvflare.apis.signal import Signal
 
+from metadata_cache import scan_shards
+from site_dataset import prune_shards, resolve_shards
+from site_metadata import ENGINES
+
+# DXO meta property holding a result's execution telemetry
+TELEMETRY_META_KEY = "telemetry"
+
+
+def peak_rss_mb(who: int = resource.RUSAGE_SELF) -> float:
+    """Peak resident set size in megabytes (RUSAGE_CHILDREN: largest worker process)."""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
 
 class CohortMetadataExtractor(Executor):
     """
@@ -28,16 +42,41 @@ class CohortMetadataExtractor(Executor):
     def __init__(
         self,
         data_root_dir: str = "/tmp/nvflare/cross_bio_bank",
-        filename: str = "patients.csv"
+        filename: str = "patients.csv",
+        engine: str = "stream",
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        workers: int = 1,
+        partitions: Optional[Dict[str, List[str]]] = None
     ):
         """
         Args:
             data_root_dir: Root directory containing site data
-            filename: Name of CSV file to read at each site
+            filename: Patient data at each site: a CSV file, a directory of
+                .csv/.csv.gz/.csv.zst/.parquet shards, or a glob
+            engine: "stream" (csv module) or "columnar" (pyarrow/pandas,
+                reads only the columns the metadata is derived from)
+            use_cache: Reuse the counters of the last run while the file is
+                unchanged, and scan only appended rows when it grew
+            cache_dir: Where to keep the cache (defaults to
+                metadata-cache/ in the site's workspace, so read-only data
+                mounts work)
+            workers: Processes the stream engine splits a full scan across
+                (line-aligned byte ranges, partial counters merged), or
+                shards scanned in parallel
+            partitions: Only read hive partitions matching these values,
+                e.g. {"enrollment_year": ["2022", "2023"]}
         """
         super().__init__()
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown extraction engine: {engine} (expected one of {', '.join(ENGINES)})")
         self.data_root_dir = data_root_dir
         self.filename = filename
+        self.engine = engine
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.workers = workers
+        self.partitions = partitions
     
     def execute(
         self,
@@ -67,40 +106,53 @@ class CohortMetadataExtractor(Executor):
             self.log_info(fl_ctx, f"Extracting cohort metadata for {site_name}")
             
             # Extract cohort metadata
-            cohort_data = self._extract_metadata(site_name, fl_ctx)
+            telemetry = {"site": site_name, "engine": self.engine, "workers": self.workers}
+            cohort_data = self._extract_metadata(site_name, fl_ctx, telemetry)
             
-            # Return as DXO
+            # Return as DXO; telemetry travels as meta, outside the catalog fields
             dxo = DXO(data_kind=DataKind.COLLECTION, data=cohort_data)
+            dxo.set_meta_prop(TELEMETRY_META_KEY, telemetry)
             return dxo.to_shareable()
             
         except Exception as e:
             self.log_exception(fl_ctx, f"Error extracting cohort metadata: {e}")
             return self._create_error_shareable(str(e))
     
-    def _extract_metadata(self, site_name: str, fl_ctx: FLContext) -> Dict:
-        """Extract cohort metadata from local data."""
-        # Read local CSV
-        csv_path = Path(self.data_root_dir) / site_name / self.filename
+    def _extract_metadata(self, site_name: str, fl_ctx: FLContext, telemetry: Optional[Dict] = None) -> Dict:
+        """Extract cohort metadata from local data, recording timings into telemetry."""
+        started = time.perf_counter()
         
-        if not csv_path.exists():
-            raise FileNotFoundError(f"Data file not found: {csv_path}")
+        # Local patient data: one CSV, or a shard directory / glob
+        data_path = Path(self.data_root_dir) / site_name / self.filename
+        shards = resolve_shards(str(data_path))
+        selected = prune_shards(shards, self.partitions)
+        if len(selected) < len(shards):
+            self.log_info(fl_ctx, f"Partition filter skipped {len(shards) - len(selected)} of {len(shards)} shards")
+        if not selected:
+            raise ValueError(f"No shards of {data_path} match partitions {self.partitions}")
         
-        patients = []
-        with open(csv_path, 'r') as f:
-            reader = csv.DictReader(f)
-            patients = list(reader)
+        # One streaming pass (or the site cache) feeds every derived field
+        cache_dir = self.cache_dir or str(
+            Path(fl_ctx.get_engine().get_workspace().get_root_dir()) / "metadata-cache"
+        )
+        counters, outcomes, bytes_scanned = scan_shards(
+            selected, self.engine, self.workers, self.use_cache, cache_dir
+        )
+        # Reading and counting are one streaming pass, timed together
+        scan_seconds = time.perf_counter() - started
+        total = counters.total
+        if total == 0:
+            raise ValueError(f"No patient records in {data_path}")
+        cache = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items()))
+        self.log_info(
+            fl_ctx,
+            f"Scanned {total} patient records from {data_path} "
+            f"({len(selected)} shards, {self.engine} engine, cache: {cache})"
+        )
         
-        total = len(patients)
-        self.log_info(fl_ctx, f"Loaded {total} patient records from {csv_path}")
-        
-        # Compute aggregated statistics
-        ethnicity_counts = Counter(p["ethnicity"] for p in patients)
-        biosample_types = set()
-        for p in patients:
-            if p.get("biosample_type"):
-                biosample_types.update(p["biosample_type"].split("|"))
-        
-        genomic_count = sum(1 for p in patients if p.get("has_genomic_data") == "Yes")
+        ethnicity_counts = counters.ethnicity_counts
+        biosample_types = counters.biosample_types
+        genomic_count = counters.genomic_count
         
         # Site name mapping (matches setup_sites.py)
         site_names = {
@@ -186,6 +238,21 @@ class CohortMetadataExtractor(Executor):
             }
         }
         
+        if telemetry is not None:
+            build_seconds = time.perf_counter() - started - scan_seconds
+            telemetry.update({
+                "scan_seconds": round(scan_seconds, 4),
+                "build_seconds": round(build_seconds, 4),
+                "rows": total,
+                "shards": len(selected),
+                "bytes_scanned": bytes_scanned,
+                "rows_per_sec": round(total / scan_seconds, 1) if scan_seconds else None,
+                "mb_per_sec": round(bytes_scanned / (1024 * 1024) / scan_seconds, 2) if scan_seconds else None,
+                "cache": outcomes,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "peak_rss_children_mb": round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            })
+        
         return cohort_data
     
     @staticmethod
@@ -6,6 +6,7 @@ Collects cohort metadata from multiple biobank sites without sharing raw patient
 import argparse
 
 from recipe import CohortDiscoveryRecipe
+from site_dataset import parse_partition_filter
 from nvflare.recipe.sim_env import SimEnv
 
 
@@ -14,6 +15,23 @@ def main():
     parser.add_argument("-n", "--n_clients", type=int, default=8)
     parser.add_argument("-d", "--data_root_dir", type=str, default="/tmp/nvflare/cross_bio_bank")
     parser.add_argument("-o", "--output_path", type=str, default="cohort_catalog")
+    parser.add_argument("-f", "--filename", type=str, default="patients.csv",
+                        help="Patient CSV, shard directory or glob below each site directory")
+    parser.add_argument("-p", "--partition", action="append", default=[],
+                        help="Only read hive partitions key=value[,value...] (repeatable)")
+    parser.add_argument("-e", "--engine", choices=["stream", "columnar"], default="stream",
+                        help="Site-side patient file reader (columnar needs pyarrow or pandas)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Rescan every patient file instead of reusing the site-side metadata cache")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="Processes per site for scanning its patient file (stream engine)")
+    parser.add_argument("--deadline", type=int, default=None,
+                        help="Seconds after which the catalog is published with the sites that answered; "
+                             "missing sites are filled in from their last-known metadata")
+    parser.add_argument("--late-window", type=int, default=0,
+                        help="Seconds to keep merging late site results after the deadline")
+    parser.add_argument("--last-known-dir", type=str, default=None,
+                        help="Directory for each site's last successful metadata (kept across runs)")
     args = parser.parse_args()
     
     # Generate site names
@@ -23,8 +41,16 @@ def main():
     recipe = CohortDiscoveryRecipe(
         name="cohort_discovery",
         data_root_dir=args.data_root_dir,
+        data_filename=args.filename,
         output_path=args.output_path,
-        min_clients=args.n_clients  # Wait for all sites
+        min_clients=args.n_clients,  # Wait for all sites
+        engine=args.engine,
+        use_cache=not args.no_cache,
+        workers=args.workers,
+        partitions=parse_partition_filter(args.partition),
+        deadline_seconds=args.deadline,
+        late_result_seconds=args.late_window,
+        last_known_dir=args.last_known_dir
     )
     
     print(f"\n{'='*60}")
@@ -32,7 +58,10 @@ def main():
     print(f"{'='*60}")
     print(f"Sites: {', '.join(sites)}")
     print(f"Data directory: {args.data_root_dir}")
-    print(f"Output: {args.output_path}.json and {args.output_path}.csv")
+    print(f"Extraction engine: {args.engine}")
+    if args.deadline:
+        print(f"Deadline: {args.deadline}s (+{args.late_window}s for late results)")
+    print(f"Output: {args.output_path}.json, {args.output_path}.ndjson and {args.output_path}.csv")
     print(f"{'='*60}\n")
     
     # Execute with simulation environment
@@ -0,0 +1,63 @@
+"""
+Last successful cohort metadata of every site, for deadline-based discovery.
+
+CohortDiscoveryController saves each site's accepted result as
+<directory>/<site>.json:
+
+    {"site": "site-6", "collected_at": "2026-10-16T02:00:04", "document": {...}}
+
+When a discovery deadline passes before a site answers (or the site fails),
+its last-known document fills the gap, marked with where it came from and how
+old it is under DISCOVERY_STATUS_FIELD. The importer ignores fields outside
+the cohort schema, so the marker stays in the JSON/NDJSON catalog only.
+"""
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DISCOVERY_STATUS_FIELD = "discovery_status"
+
+
+class LastKnownStore:
+    """One JSON file per site holding its last accepted cohort document."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, site: str) -> str:
+        return os.path.join(self.directory, f"{site}.json")
+
+    def save(self, site: str, document: Dict[str, Any], collected_at: Optional[datetime] = None):
+        os.makedirs(self.directory, exist_ok=True)
+        entry = {
+            "site": site,
+            "collected_at": (collected_at or datetime.now()).isoformat(timespec="seconds"),
+            "document": document,
+        }
+        tmp_path = f"{self._path(site)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(tmp_path, self._path(site))
+
+    def load(self, site: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(site)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def fallback(self, site: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """The site's last-known document marked as such with its age, or None."""
+        entry = self.load(site)
+        if entry is None:
+            return None
+        age = (now or datetime.now()) - datetime.fromisoformat(entry["collected_at"])
+        document = dict(entry["document"])
+        document[DISCOVERY_STATUS_FIELD] = {
+            "source": "last_known",
+            "site": site,
+            "collected_at": entry["collected_at"],
+            "age_seconds": int(age.total_seconds()),
+        }
+        return document
@@ -0,0 +1,179 @@
+"""
+Site-side cache of extracted cohort counters.
+
+Discovery runs nightly while most patient files change rarely, and then
+usually by appending rows. The cache stores the SiteCounters of a patient file
+next to a fingerprint of the file it was computed from:
+
+    {"path": "/data/site-1/patients.csv", "size": 123, "mtime_ns": 456,
+     "header": [...], "head_sha256": "...", "tail_sha256": "...",
+     "counters": {...}}
+
+head_sha256 covers the first FINGERPRINT_BYTES of the file and tail_sha256 the
+last FINGERPRINT_BYTES before size. Lookups end in one of three ways:
+
+    hit     size, mtime and both hashes match: the stored counters are returned
+    append  the file grew, still starts with the cached head and still has the
+            cached tail at the old end, which was a line end: only the new rows
+            are scanned and merged into the stored counters
+    miss    anything else (rewrite, truncation, no cache): full scan
+
+Appends are only detected for plain CSV files. Sharded datasets are cached
+shard by shard (scan_shards), so only new or changed shards are scanned.
+
+Cache files live in cache_dir (CohortMetadataExtractor passes a directory in
+the site's workspace), or next to the data file without one. A cache that
+cannot be written, e.g. on a read-only mount, only costs a full scan next time.
+"""
+import contextlib
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from site_dataset import Shard, compression_of, is_parquet
+from site_metadata import SiteCounters, read_header, scan_csv_from, scan_patients
+
+CACHE_SUFFIX = ".metadata-cache.json"
+FINGERPRINT_BYTES = 64 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(path: str, start: int, end: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(end - start)).hexdigest()
+
+
+def _fingerprint(path: str, size: int) -> Dict[str, Any]:
+    return {
+        "head_sha256": _digest(path, 0, min(size, FINGERPRINT_BYTES)),
+        "tail_sha256": _digest(path, max(0, size - FINGERPRINT_BYTES), size),
+    }
+
+
+def _ends_with_newline(path: str, size: int) -> bool:
+    if size == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        return f.read(1) == b"\n"
+
+
+def default_cache_path(data_path: str, cache_dir: Optional[str] = None) -> str:
+    directory, name = os.path.split(os.path.abspath(data_path))
+    if cache_dir is None:
+        return os.path.join(directory, f".{name}{CACHE_SUFFIX}")
+    # Shards of different partitions often share a file name
+    digest = hashlib.sha1(directory.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f".{name}.{digest}{CACHE_SUFFIX}")
+
+
+def load_cache(cache_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cache(cache_path: str, state: Dict[str, Any]) -> bool:
+    """Write the cache atomically; returns False (with a warning) if it cannot be written."""
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Cannot write metadata cache {cache_path}: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def cached_scan(
+    data_path: str, cache_path: str, engine: str = "stream", workers: int = 1
+) -> Tuple[SiteCounters, str, int]:
+    """
+    Counters for a patient file, reusing the cache where the file allows it.
+    Returns (counters, outcome, bytes scanned) with outcome "hit", "append"
+    or "miss".
+    """
+    data_path = os.path.abspath(data_path)
+    stat = os.stat(data_path)
+    size = stat.st_size
+    cache = load_cache(cache_path)
+    if cache is not None and cache.get("path") != data_path:
+        cache = None
+
+    counters, outcome, scanned = None, "miss", size
+    if cache is not None:
+        cached_size = cache["size"]
+        head_end = min(cached_size, FINGERPRINT_BYTES)
+        same_head = size >= cached_size and _digest(data_path, 0, head_end) == cache["head_sha256"]
+        same_tail = same_head and _digest(
+            data_path, max(0, cached_size - FINGERPRINT_BYTES), cached_size
+        ) == cache["tail_sha256"]
+        if same_tail and size == cached_size and stat.st_mtime_ns == cache["mtime_ns"]:
+            return SiteCounters.from_dict(cache["counters"]), "hit", 0
+        appendable = compression_of(data_path) is None and not is_parquet(data_path)
+        if same_tail and appendable and size > cached_size and _ends_with_newline(data_path, cached_size):
+            counters = SiteCounters.from_dict(cache["counters"])
+            counters.merge(scan_csv_from(data_path, cached_size, cache["header"]))
+            outcome, scanned = "append", size - cached_size
+
+    if counters is None:
+        counters = scan_patients(data_path, engine, workers)
+    if os.stat(data_path).st_size != size:
+        # Appended to while scanning: the counters may cover bytes past size
+        return counters, outcome, scanned
+    save_cache(cache_path, {
+        "path": data_path,
+        "size": size,
+        "mtime_ns": stat.st_mtime_ns,
+        "header": read_header(data_path),
+        **_fingerprint(data_path, size),
+        "counters": counters.to_dict(),
+    })
+    return counters, outcome, scanned
+
+
+def scan_shard(
+    path: str, engine: str = "stream", workers: int = 1, use_cache: bool = True, cache_dir: Optional[str] = None
+) -> Tuple[SiteCounters, str, int]:
+    if not use_cache:
+        return scan_patients(path, engine, workers), "disabled", os.path.getsize(path)
+    return cached_scan(path, default_cache_path(path, cache_dir), engine, workers)
+
+
+def scan_shards(
+    shards: List[Shard],
+    engine: str = "stream",
+    workers: int = 1,
+    use_cache: bool = True,
+    cache_dir: Optional[str] = None,
+) -> Tuple[SiteCounters, Dict[str, int], int]:
+    """
+    Counters of a whole site dataset, merged from its shards; several shards
+    are scanned in parallel, a single large one over byte ranges. Returns
+    (counters, number of shards per cache outcome, bytes scanned).
+    """
+    counters, outcomes, scanned = SiteCounters(), {}, 0
+    if len(shards) == 1 or workers <= 1:
+        results = [scan_shard(shard.path, engine, workers, use_cache, cache_dir) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            futures = [
+                pool.submit(scan_shard, shard.path, engine, 1, use_cache, cache_dir) for shard in shards
+            ]
+            results = [future.result() for future in futures]
+    for shard_counters, outcome, shard_scanned in results:
+        counters.merge(shard_counters)
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        scanned += shard_scanned
+    return counters, outcomes, scanned
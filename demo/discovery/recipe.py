@@ -4,11 +4,18 @@ Recipe for federated cohort discovery.
 This recipe collects cohort metadata from multiple biobank sites
 without sharing raw patient data.
 """
-from typing import List
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
 
 from nvflare.job_config.api import FedJob
 from nvflare.recipe.spec import Recipe
 
+# Cohort schema shared with the importer; CatalogWriter flattens documents with
+# it. Imported here from ihcc-api/scripts and shipped to the server with the job
+COHORT_SCHEMA_SCRIPT = Path(__file__).resolve().parents[2] / "ihcc-api" / "scripts" / "cohort_schema.py"
+sys.path.append(str(COHORT_SCHEMA_SCRIPT.parent))
+
 from writer import CatalogWriter
 from controller import CohortDiscoveryController
 from executor import CohortMetadataExtractor
@@ -30,8 +37,27 @@ class CohortDiscoveryRecipe(Recipe):
         name (str): The name of the cohort discovery job.
         data_root_dir (str): Root directory containing site data. Each site's
             data should be in {data_root_dir}/{site_name}/{data_filename}.
-        data_filename (str): Name of the CSV file at each site containing
-            patient data. Defaults to "patients.csv".
+        data_filename (str): Patient data at each site: a CSV file, a directory
+            of .csv/.csv.gz/.csv.zst/.parquet shards, or a glob. Defaults to
+            "patients.csv".
+        engine (str): How sites read their patient file: "stream" (csv module,
+            no dependencies) or "columnar" (pyarrow/pandas, reads only the
+            columns the metadata needs). Defaults to "stream".
+        use_cache (bool): Let sites reuse the counters of their last run while
+            the patient file is unchanged, scanning only appended rows when it
+            grew. Defaults to True.
+        workers (int): Processes each site splits a full scan of its patient
+            file across (stream engine), or shards it scans in parallel.
+            Defaults to 1.
+        partitions (dict): Only read hive partitions matching these values,
+            e.g. {"enrollment_year": ["2022", "2023"]}. Defaults to all.
+        deadline_seconds (int): Publish the catalog after this many seconds
+            with the sites that answered, filling in the others from their
+            last successful metadata. Defaults to None (wait for min_clients).
+        late_result_seconds (int): After the deadline, how long to keep
+            merging late site results into the catalog. Defaults to 0.
+        last_known_dir (str): Where the server keeps each site's last
+            successful metadata. Defaults to a directory in the workspace.
         output_path (str): Base path for output files (without extension).
             Will generate both JSON and CSV outputs.
         min_clients (int): Minimum number of clients to wait for. Defaults to 1.
@@ -58,10 +84,24 @@ class CohortDiscoveryRecipe(Recipe):
         data_root_dir: str = "/tmp/nvflare/cross_bio_bank",
         data_filename: str = "patients.csv",
         output_path: str = "cohort_catalog",
-        min_clients: int = 1
+        min_clients: int = 1,
+        engine: str = "stream",
+        use_cache: bool = True,
+        workers: int = 1,
+        partitions: Optional[Dict[str, List[str]]] = None,
+        deadline_seconds: Optional[int] = None,
+        late_result_seconds: int = 0,
+        last_known_dir: Optional[str] = None
     ):
         self.data_root_dir = data_root_dir
         self.data_filename = data_filename
+        self.engine = engine
+        self.use_cache = use_cache
+        self.workers = workers
+        self.partitions = partitions
+        self.deadline_seconds = deadline_seconds
+        self.late_result_seconds = late_result_seconds
+        self.last_known_dir = last_known_dir
         self.output_path = output_path
         self.min_clients = min_clients
         
@@ -71,7 +111,10 @@ class CohortDiscoveryRecipe(Recipe):
         # Server-side controller
         controller = CohortDiscoveryController(
             output_path=f"{output_path}.json",
-            min_clients=min_clients
+            min_clients=min_clients,
+            deadline_seconds=deadline_seconds,
+            late_result_seconds=late_result_seconds,
+            last_known_dir=last_known_dir
         )
         
         # Server-side writer (collects and saves cohort data)
@@ -80,11 +123,16 @@ class CohortDiscoveryRecipe(Recipe):
         # Add to server
         job.to_server(controller)
         job.to_server(writer, id="catalog_writer")
+        job.to_server(str(COHORT_SCHEMA_SCRIPT))
         
         # Client-side executor
         executor = CohortMetadataExtractor(
             data_root_dir=data_root_dir,
-            filename=data_filename
+            filename=data_filename,
+            engine=engine,
+            use_cache=use_cache,
+            workers=workers,
+            partitions=partitions
         )
         
         # Add to all clients
@@ -0,0 +1,75 @@
+"""
+Performance report of a cohort discovery run.
+
+CohortDiscoveryController records, for every site that answered, when the
+result arrived (seconds since the task was broadcast) and the telemetry the
+site attached to it (scan time, i.e. reading and counting the patient data in
+one pass, document build time, bytes scanned, rows/sec, peak RSS).
+build_run_report() turns those records into the report written next to the
+catalog, e.g. cohort_catalog.performance.json:
+
+    {"sites_responded": 8, "sites_ok": 8, "min_responses": 8,
+     "time_to_min_responses_seconds": 4.1, "time_to_all_responses_seconds": 4.1,
+     "latency_seconds": {"min": 0.4, "p50": 0.9, "p90": 3.8, "max": 4.1, "mean": 1.3},
+     "slowest_sites": [{"site": "site-6", "latency_seconds": 4.1, ...}, ...],
+     "sites": [...]}
+"""
+import math
+from typing import Any, Dict, List, Optional
+
+SLOWEST_SITES = 3
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    rank = max(1, math.ceil(percent / 100 * len(values)))
+    return values[rank - 1]
+
+
+def latency_distribution(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"min": None, "p50": None, "p90": None, "max": None, "mean": None}
+    values = sorted(latencies)
+    return {
+        "min": round(values[0], 3),
+        "p50": round(_percentile(values, 50), 3),
+        "p90": round(_percentile(values, 90), 3),
+        "max": round(values[-1], 3),
+        "mean": round(sum(values) / len(values), 3),
+    }
+
+
+def build_run_report(
+    sites: List[Dict[str, Any]],
+    min_responses: int,
+    started_at: Optional[str] = None,
+    time_to_min_responses: Optional[float] = None,
+    missing_sites: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    sites: one record per result, {"site", "status", "latency_seconds",
+    "telemetry"} in arrival order ("late": True after a discovery deadline).
+    missing_sites: sites without current-round metadata at the end of the run.
+    """
+    ok = [site for site in sites if site["status"] == "OK"]
+    latencies = [site["latency_seconds"] for site in ok]
+    slowest = sorted(ok, key=lambda site: site["latency_seconds"], reverse=True)[:SLOWEST_SITES]
+    return {
+        "started_at": started_at,
+        "sites_responded": len(sites),
+        "sites_ok": len(ok),
+        "sites_failed": [site["site"] for site in sites if site["status"] != "OK"],
+        "sites_late": [site["site"] for site in sites if site.get("late")],
+        "sites_missing": missing_sites or [],
+        "min_responses": min_responses,
+        "time_to_min_responses_seconds": (
+            round(time_to_min_responses, 3) if time_to_min_responses is not None else None
+        ),
+        "time_to_all_responses_seconds": round(max(latencies), 3) if latencies else None,
+        "latency_seconds": latency_distribution(latencies),
+        "slowest_sites": [
+            {"site": site["site"], "latency_seconds": round(site["latency_seconds"], 3), **(site["telemetry"] or {})}
+            for site in slowest
+        ],
+        "sites": sites,
+    }
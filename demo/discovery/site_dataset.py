@@ -0,0 +1,133 @@
+"""
+Site patient datasets: a single file, a directory of shards or a glob.
+
+Sites keep patient extracts as one CSV, as directories of gzip/zstd
+compressed CSV shards, or as Parquet partitions, often hive-partitioned by
+enrollment year:
+
+    patients.csv
+    patients/part-0000.csv.gz, patients/part-0001.csv.zst, ...
+    patients/enrollment_year=2019/part-0.parquet, ...
+    patients/*.csv.gz
+
+Both the discovery executor and the fedstats client resolve
+{data_root_dir}/{site}/{filename} into shards here. Partition values are read
+from key=value path components; a partition filter drops shards whose
+partition values cannot match before they are opened. Compressed shards are
+decompressed while they are read.
+
+Requires zstandard (pip install zstandard) for .zst shards and pyarrow for
+Parquet shards.
+"""
+import glob
+import gzip
+import io
+import os
+from typing import Dict, Iterable, List, Optional
+
+SHARD_SUFFIXES = (".csv", ".csv.gz", ".csv.zst", ".parquet")
+
+
+class Shard:
+    """One file of a site dataset and the hive partition values of its path."""
+
+    def __init__(self, path: str, partition: Optional[Dict[str, str]] = None):
+        self.path = path
+        self.partition = partition or {}
+
+    def __repr__(self):
+        return f"Shard({self.path!r}, {self.partition!r})"
+
+
+def compression_of(path: str) -> Optional[str]:
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def is_parquet(path: str) -> bool:
+    return str(path).endswith(".parquet")
+
+
+def open_text(path):
+    """Open a (possibly compressed) CSV shard for csv.reader, decompressing as it is read."""
+    path = str(path)
+    compression = compression_of(path)
+    if compression == "gzip":
+        return gzip.open(path, "rt", newline="")
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd shards require zstandard (pip install zstandard)")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), newline="")
+    return open(path, "r", newline="")
+
+
+def partition_values(path: str, root: str) -> Dict[str, str]:
+    """key=value directory components of path below root."""
+    relative = os.path.relpath(os.path.dirname(path), root)
+    values = {}
+    for part in relative.split(os.sep):
+        key, sep, value = part.partition("=")
+        if sep:
+            values[key] = value
+    return values
+
+
+def _is_shard(path: str) -> bool:
+    name = os.path.basename(path)
+    return os.path.isfile(path) and name.endswith(SHARD_SUFFIXES) and not name.startswith((".", "_"))
+
+
+def resolve_shards(location: str) -> List[Shard]:
+    """Shards of a dataset given as a file, a directory (searched recursively) or a glob."""
+    location = str(location)
+    if glob.has_magic(location):
+        root = location.split("*")[0].split("?")[0].split("[")[0]
+        root = root if root.endswith(os.sep) else os.path.dirname(root)
+        paths = glob.glob(location, recursive=True)
+    elif os.path.isdir(location):
+        root = location
+        paths = [
+            os.path.join(directory, name)
+            for directory, _, names in os.walk(location)
+            for name in names
+        ]
+    elif os.path.exists(location):
+        return [Shard(location)]
+    else:
+        raise FileNotFoundError(f"Data file not found: {location}")
+
+    shards = [Shard(path, partition_values(path, root)) for path in sorted(paths) if _is_shard(path)]
+    if not shards:
+        raise FileNotFoundError(f"No patient shards ({', '.join(SHARD_SUFFIXES)}) in {location}")
+    return shards
+
+
+def parse_partition_filter(specs: Iterable[str]) -> Dict[str, List[str]]:
+    """["enrollment_year=2019,2020", ...] -> {"enrollment_year": ["2019", "2020"]}"""
+    partition_filter: Dict[str, List[str]] = {}
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Partition filter must look like key=value[,value...]: {spec}")
+        partition_filter.setdefault(key, []).extend(v for v in values.split(",") if v)
+    return partition_filter
+
+
+def prune_shards(shards: List[Shard], partition_filter: Optional[Dict[str, List[str]]]) -> List[Shard]:
+    """
+    Drop shards whose partition values rule them out. Shards not partitioned
+    by a filtered key are kept, as they may hold any value of it.
+    """
+    if not partition_filter:
+        return shards
+    allowed = {key: {str(value) for value in values} for key, values in partition_filter.items()}
+    return [
+        shard for shard in shards
+        if all(shard.partition[key] in values for key, values in allowed.items() if key in shard.partition)
+    ]
@@ -0,0 +1,320 @@
+"""
+Online counters for site-side cohort metadata extraction.
+
+Everything CohortMetadataExtractor publishes about a site's patients is
+derived from four counters: the number of records, ethnicity counts, the set
+of biosample types and the number of records with genomic data. They are
+filled in one streaming pass over the patient file, so memory stays constant
+however many patients a site holds.
+
+Engines:
+    stream    csv.reader over every row (no dependencies)
+    columnar  reads only the required columns as dictionary-encoded (categorical)
+              blocks with pyarrow, or pandas if pyarrow is missing, and counts
+              them with vectorized value_counts; biosample_type cells are only
+              split once per distinct value
+
+With workers > 1 the stream engine splits the file into byte ranges that
+start and end on line boundaries and counts them in a process pool; the
+partial counters are merged. Ranges are found by searching for newlines, so
+this assumes no quoted field spans lines (true of patient extracts, which hold
+one record per line). The columnar engine already parses with pyarrow's
+thread pool and ignores workers.
+
+Compressed CSV shards (.csv.gz, .csv.zst) are decompressed while they are
+read, serially. Parquet shards are always read columnar, and only the
+required columns are read from them.
+
+    pip install pyarrow  # optional, fastest columnar engine; needed for Parquet
+"""
+import csv
+import io
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from importlib.util import find_spec
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from site_dataset import compression_of, is_parquet, open_text
+
+# Patient file columns the cohort metadata is derived from
+REQUIRED_COLUMNS = ("ethnicity", "biosample_type", "has_genomic_data")
+
+ENGINES = ("stream", "columnar")
+
+# Block sizes of the columnar engine (pyarrow bytes, pandas rows)
+COLUMNAR_BLOCK_BYTES = 16 * 1024 * 1024
+COLUMNAR_CHUNK_ROWS = 1_000_000
+
+# Parallel stream engine: smallest byte range worth a process, read block size
+MIN_RANGE_BYTES = 4 * 1024 * 1024
+RANGE_READ_BYTES = 4 * 1024 * 1024
+
+# Distinct raw biosample_type cells remembered to skip re-splitting them
+_SEEN_BIOSAMPLE_LIMIT = 4096
+
+
+class SiteCounters:
+    """Aggregates of a site's patient records."""
+
+    def __init__(self):
+        self.total = 0
+        self.ethnicity_counts: Counter = Counter()
+        self.biosample_types: Set[str] = set()
+        self.genomic_count = 0
+
+    def merge(self, other: "SiteCounters") -> "SiteCounters":
+        """Add the counts of other (e.g. another part of the same file)."""
+        self.total += other.total
+        self.ethnicity_counts.update(other.ethnicity_counts)
+        self.biosample_types.update(other.biosample_types)
+        self.genomic_count += other.genomic_count
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "ethnicity_counts": dict(self.ethnicity_counts),
+            "biosample_types": sorted(self.biosample_types),
+            "genomic_count": self.genomic_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SiteCounters":
+        counters = cls()
+        counters.total = data["total"]
+        counters.ethnicity_counts.update(data["ethnicity_counts"])
+        counters.biosample_types.update(data["biosample_types"])
+        counters.genomic_count = data["genomic_count"]
+        return counters
+
+    def add_value_counts(self, column: str, counts: Dict[str, int]):
+        """Add the value counts of one required column of a block of records."""
+        if column == "ethnicity":
+            self.ethnicity_counts.update(counts)
+        elif column == "biosample_type":
+            for value, count in counts.items():
+                if value and count:
+                    self.biosample_types.update(value.split("|"))
+        elif column == "has_genomic_data":
+            self.genomic_count += counts.get("Yes", 0)
+
+
+def column_positions(header: List[str]) -> Dict[str, Optional[int]]:
+    """Position of each required column in a CSV header (None if absent)."""
+    if "ethnicity" not in header:
+        raise ValueError("Patient file has no 'ethnicity' column")
+    return {column: header.index(column) if column in header else None for column in REQUIRED_COLUMNS}
+
+
+def count_rows(
+    rows: Iterable[List[str]],
+    positions: Dict[str, Optional[int]],
+    counters: Optional[SiteCounters] = None,
+) -> SiteCounters:
+    """Feed csv.reader rows into counters in a single pass."""
+    counters = counters if counters is not None else SiteCounters()
+    ethnicity_at = positions["ethnicity"]
+    biosample_at = positions["biosample_type"]
+    genomic_at = positions["has_genomic_data"]
+    biosample_types = counters.biosample_types
+    seen_biosamples: Set[str] = set()
+
+    def cell(row, position):
+        return row[position] if position is not None and position < len(row) else ""
+
+    ethnicity_counts = counters.ethnicity_counts
+    total = genomic = 0
+    for row in rows:
+        if not row:
+            continue
+        total += 1
+        ethnicity = cell(row, ethnicity_at)
+        ethnicity_counts[ethnicity] = ethnicity_counts.get(ethnicity, 0) + 1
+        biosample = cell(row, biosample_at)
+        if biosample and biosample not in seen_biosamples:
+            biosample_types.update(biosample.split("|"))
+            if len(seen_biosamples) < _SEEN_BIOSAMPLE_LIMIT:
+                seen_biosamples.add(biosample)
+        if cell(row, genomic_at) == "Yes":
+            genomic += 1
+
+    counters.total += total
+    counters.genomic_count += genomic
+    return counters
+
+
+def read_header(path) -> List[str]:
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+        return pq.read_schema(str(path)).names
+    with open_text(path) as f:
+        header = next(csv.reader(f), None)
+    if header is None:
+        raise ValueError(f"Patient file is empty: {path}")
+    return header
+
+
+def scan_csv(path) -> SiteCounters:
+    """Stream a (possibly compressed) patient CSV file into counters."""
+    with open_text(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"Patient file is empty: {path}")
+        return count_rows(reader, column_positions(header))
+
+
+def scan_csv_from(path, offset: int, header: List[str]) -> SiteCounters:
+    """Stream the records of a patient CSV file that start at byte offset (a line start)."""
+    with open(path, "rb") as raw:
+        raw.seek(offset)
+        reader = csv.reader(io.TextIOWrapper(raw, newline=""))
+        return count_rows(reader, column_positions(header))
+
+
+def byte_ranges(path, parts: int) -> List[Tuple[int, int]]:
+    """Split the records of a CSV file into at most parts line-aligned (start, end) byte ranges."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()
+        data_start = f.tell()
+        parts = max(1, min(parts, (size - data_start) // MIN_RANGE_BYTES))
+        offsets = [data_start]
+        for part in range(1, parts):
+            f.seek(max(offsets[-1], data_start + (size - data_start) * part // parts))
+            if f.tell() > data_start:
+                f.seek(f.tell() - 1)
+                f.readline()
+            if offsets[-1] < f.tell() < size:
+                offsets.append(f.tell())
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def scan_csv_range(path, start: int, end: int, header: List[str]) -> SiteCounters:
+    """Count the records in bytes [start, end) of a CSV file; both are line starts (or EOF)."""
+    positions = column_positions(header)
+    counters = SiteCounters()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining, carry = end - start, b""
+        while remaining > 0:
+            block = f.read(min(RANGE_READ_BYTES, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            block = carry + block
+            if remaining > 0:
+                cut = block.rfind(b"\n") + 1
+                block, carry = block[:cut], block[cut:]
+            else:
+                carry = b""
+            count_rows(csv.reader(block.decode().split("\n")), positions, counters)
+    return counters
+
+
+def scan_csv_parallel(path, workers: int) -> SiteCounters:
+    """scan_csv over line-aligned byte ranges in a pool of worker processes."""
+    header = read_header(path)
+    column_positions(header)
+    ranges = byte_ranges(path, workers)
+    if len(ranges) == 1:
+        return scan_csv(path)
+    counters = SiteCounters()
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(scan_csv_range, str(path), start, end, header) for start, end in ranges]
+        for future in futures:
+            counters.merge(future.result())
+    return counters
+
+
+def _present_columns(path) -> List[str]:
+    positions = column_positions(read_header(path))
+    return [column for column in REQUIRED_COLUMNS if positions[column] is not None]
+
+
+def _arrow_value_counts(array) -> Dict[str, int]:
+    """value_counts of an Arrow array as CSV cell text (missing -> "", booleans -> Yes/No)."""
+    import pyarrow.compute as pc
+
+    counts: Dict[str, int] = {}
+    values = pc.value_counts(array)
+    for value, count in zip(values.field("values").to_pylist(), values.field("counts").to_pylist()):
+        if value is None:
+            value = ""
+        elif isinstance(value, bool):
+            value = "Yes" if value else "No"
+        value = str(value)
+        counts[value] = counts.get(value, 0) + count
+    return counts
+
+
+def _scan_pyarrow(path, columns: List[str]) -> SiteCounters:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    read_options = pacsv.ReadOptions(block_size=COLUMNAR_BLOCK_BYTES)
+    convert_options = pacsv.ConvertOptions(
+        include_columns=columns,
+        column_types={column: categorical for column in columns},
+    )
+    counters = SiteCounters()
+    source = pa.input_stream(str(path), compression=compression_of(str(path)))
+    with pacsv.open_csv(source, read_options=read_options, convert_options=convert_options) as reader:
+        for batch in reader:
+            counters.total += batch.num_rows
+            for column in columns:
+                counters.add_value_counts(column, _arrow_value_counts(batch.column(column)))
+    return counters
+
+
+def _scan_parquet(path, columns: List[str]) -> SiteCounters:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet shards require pyarrow (pip install pyarrow)")
+
+    counters = SiteCounters()
+    parquet_file = pq.ParquetFile(str(path), read_dictionary=columns)
+    for batch in parquet_file.iter_batches(batch_size=COLUMNAR_CHUNK_ROWS, columns=columns):
+        counters.total += batch.num_rows
+        for column in columns:
+            counters.add_value_counts(column, _arrow_value_counts(batch.column(column)))
+    return counters
+
+
+def _scan_pandas(path, columns: List[str]) -> SiteCounters:
+    import pandas as pd
+
+    counters = SiteCounters()
+    chunks = pd.read_csv(
+        path, usecols=columns, dtype="category", keep_default_na=False, chunksize=COLUMNAR_CHUNK_ROWS
+    )
+    for chunk in chunks:
+        counters.total += len(chunk)
+        for column in columns:
+            counters.add_value_counts(column, chunk[column].value_counts().to_dict())
+    return counters
+
+
+def scan_columnar(path) -> SiteCounters:
+    """Read only the required columns of a patient CSV file, block by block."""
+    columns = _present_columns(path)
+    if find_spec("pyarrow") is not None:
+        return _scan_pyarrow(path, columns)
+    if find_spec("pandas") is None:
+        raise ImportError("The columnar engine requires pyarrow or pandas (pip install pyarrow)")
+    return _scan_pandas(path, columns)
+
+
+def scan_patients(path, engine: str = "stream", workers: int = 1) -> SiteCounters:
+    if is_parquet(path):
+        return _scan_parquet(path, _present_columns(path))
+    if engine == "columnar":
+        return scan_columnar(path)
+    if engine == "stream":
+        parallel = workers > 1 and compression_of(str(path)) is None
+        return scan_csv_parallel(path, workers) if parallel else scan_csv(path)
+    raise ValueError(f"Unknown extraction engine: {engine} (expected one of {', '.join(ENGINES)})")
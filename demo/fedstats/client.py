@@ -1,10 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import pandas as pd
 
 from nvflare.app_opt.statistics.df.df_core_statistics import DFStatisticsCore
 
+# Shared with the discovery executor; job.py ships it to the sites
+from site_dataset import Shard, is_parquet, prune_shards, resolve_shards
+
+
+def _read_shard(shard: Shard) -> pd.DataFrame:
+    """Read one shard; hive partition values become columns again."""
+    if is_parquet(shard.path):
+        df = pd.read_parquet(shard.path)
+    else:
+        # Compression (.gz/.zst) is inferred from the extension
+        df = pd.read_csv(shard.path)
+    for key, value in shard.partition.items():
+        if key not in df.columns:
+            df[key] = int(value) if value.lstrip("-").isdigit() else value
+    return df
+
 
 class PatientStatistics(DFStatisticsCore):
     """
@@ -17,16 +34,24 @@ class PatientStatistics(DFStatisticsCore):
     def __init__(
         self,
         data_root_dir: str = "/tmp/nvflare/cross_bio_bank",
-        filename: str = "patients.csv"
+        filename: str = "patients.csv",
+        partitions: Optional[Dict[str, List[str]]] = None,
+        workers: int = 4
     ):
         """
         Args:
             data_root_dir: Root directory containing site data
-            filename: Name of CSV file to read at each site
+            filename: Patient data at each site: a CSV file, a directory of
+                .csv/.csv.gz/.csv.zst/.parquet shards, or a glob
+            partitions: Only read hive partitions matching these values,
+                e.g. {"enrollment_year": ["2022", "2023"]}
+            workers: Shards read concurrently
         """
         super().__init__()
         self.data_root_dir = data_root_dir
         self.filename = filename
+        self.partitions = partitions
+        self.workers = workers
         self.data: Optional[Dict[str, pd.DataFrame]] = None
     
     def initialize(self, fl_ctx):
@@ -34,9 +59,15 @@ class PatientStatistics(DFStatisticsCore):
         # Get site name
         site_name = fl_ctx.get_identity_name()
         
-        # Load CSV
-        csv_path = Path(self.data_root_dir) / site_name / self.filename
-        df = pd.read_csv(csv_path)
+        # Load patient data: one CSV, or the shards of a directory / glob
+        data_path = Path(self.data_root_dir) / site_name / self.filename
+        shards = resolve_shards(str(data_path))
+        selected = prune_shards(shards, self.partitions)
+        if not selected:
+            raise ValueError(f"No shards of {data_path} match partitions {self.partitions}")
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(selected)))) as pool:
+            frames = list(pool.map(_read_shard, selected))
+        df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
         
         # Convert categorical to numerical for statistics
         # Map Yes/No to 1/0 for computing statistics on these fields
@@ -47,6 +78,9 @@ class PatientStatistics(DFStatisticsCore):
         # Store as dataset dictionary (DFStatistics expects this format)
         self.data = {"patients": df}
         
-        self.log_info(fl_ctx, f"Loaded {len(df)} records from {csv_path}")
+        self.log_info(
+            fl_ctx,
+            f"Loaded {len(df)} records from {data_path} ({len(selected)} of {len(shards)} shards)"
+        )
         self.log_info(fl_ctx, f"Features: {list(df.columns)}")
 
@@ -4,10 +4,18 @@ Federated Statistics Job - Compute cross-site statistics without sharing raw dat
 Example: Compute mean age, BMI distribution across all biobanks.
 """
 import argparse
+import sys
+from pathlib import Path
 
 from nvflare.recipe.fedstats import FedStatsRecipe
 from nvflare.recipe.sim_env import SimEnv
 
+# Shard resolution shared with cohort discovery: imported here from
+# demo/discovery and shipped to the sites with the client code
+SITE_DATASET_SCRIPT = Path(__file__).resolve().parents[1] / "discovery" / "site_dataset.py"
+sys.path.append(str(SITE_DATASET_SCRIPT.parent))
+
+from site_dataset import parse_partition_filter
 from client import PatientStatistics
 
 
@@ -16,6 +24,10 @@ def main():
     parser.add_argument("-n", "--n_clients", type=int, default=8)
     parser.add_argument("-d", "--data_root_dir", type=str, default="/tmp/nvflare/cross_bio_bank")
     parser.add_argument("-o", "--output_path", type=str, default="statistics/patient_stats.json")
+    parser.add_argument("-f", "--filename", type=str, default="patients.csv",
+                        help="Patient CSV, shard directory or glob below each site directory")
+    parser.add_argument("-p", "--partition", action="append", default=[],
+                        help="Only read hive partitions key=value[,value...] (repeatable)")
     args = parser.parse_args()
 
     # Configure statistics to compute
@@ -32,8 +44,9 @@ def main():
 
     # Statistics generator
     stats_generator = PatientStatistics(
-        filename="patients.csv",
-        data_root_dir=args.data_root_dir
+        filename=args.filename,
+        data_root_dir=args.data_root_dir,
+        partitions=parse_partition_filter(args.partition)
     )
 
     sites = [f"site-{i + 1}" for i in range(args.n_clients)]
@@ -46,6 +59,7 @@ def main():
         statistic_configs=statistic_configs,
         stats_generator=stats_generator,
     )
+    recipe.job.to_clients(str(SITE_DATASET_SCRIPT))
 
     print(f"\n{'='*60}")
     print("Federated Statistics Job")
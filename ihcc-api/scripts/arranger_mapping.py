@@ -0,0 +1,100 @@
+"""
+Aggregation-optimized cohort mapping derived from the Arranger project metadata.
+
+Arranger (ihcc-api/src/arrangerMetadata/projectMetadata.json) decides which
+fields the dashboard facets on (aggs-state, nested fields joined with "__"),
+which columns the table shows and sorts (columns-state) and the default table
+sort. From that the mapping generator:
+
+- enables eager_global_ordinals on faceted keyword fields, so facet ordinals
+  are built at refresh time instead of on the first dashboard query
+- disables indexing on the display-only fields in DISPLAY_ONLY_FIELDS, and
+  their doc_values too unless the dashboard still facets or sorts on them
+  (display_only_conflicts() lists those, so the two configs cannot drift
+  apart unnoticed); they are only read from _source
+- sorts the index by the table's default sort keys, so the default cohort
+  listing can terminate early
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Set, Tuple
+
+DEFAULT_ARRANGER_METADATA = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "src", "arrangerMetadata", "projectMetadata.json"
+)
+
+# Types whose values have global ordinals / can be used as index sort keys
+ORDINAL_TYPES = {"keyword"}
+SORTABLE_TYPES = {"keyword", "integer", "long", "boolean", "date"}
+
+# Fields that are shown but never filtered or searched on (dotted paths)
+DISPLAY_ONLY_FIELDS = {"website"}
+
+
+def load_arranger_metadata(path: str = DEFAULT_ARRANGER_METADATA) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def field_usage(metadata: Dict[str, Any]) -> Tuple[Set[str], Set[str], List[Tuple[str, bool]]]:
+    """
+    (faceted fields, sortable columns, default sort as (field, descending))
+    from Arranger project metadata, with fields as dotted document paths.
+    """
+    config = metadata["config"]
+    faceted = {
+        agg["field"].replace("__", ".")
+        for agg in config["aggs-state"]["state"]
+        if agg.get("show") and agg.get("active")
+    }
+    columns = config["columns-state"]["state"]
+    sortable = {column["field"] for column in columns["columns"] if column.get("sortable")}
+    default_sort = [(sort["id"], bool(sort.get("desc"))) for sort in columns.get("defaultSorted", [])]
+    return faceted, sortable, default_sort
+
+
+def display_only_conflicts(metadata: Dict[str, Any]) -> List[str]:
+    """DISPLAY_ONLY_FIELDS the dashboard facets or sorts on (these keep doc_values)."""
+    faceted, sortable, _ = field_usage(metadata)
+    return sorted(DISPLAY_ONLY_FIELDS & (faceted | sortable))
+
+
+def _leaf_fields(properties: Dict[str, Any], prefix: str = ""):
+    for name, spec in properties.items():
+        path = f"{prefix}{name}"
+        if "properties" in spec:
+            yield from _leaf_fields(spec["properties"], f"{path}.")
+        else:
+            yield path, spec
+
+
+def aggregation_profile(properties: Dict[str, Any], metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Tune cohort mapping properties (mapping_properties()) for the dashboard;
+    returns (properties, index sort settings). The input is not modified.
+    """
+    faceted, sortable, default_sort = field_usage(metadata)
+    properties = json.loads(json.dumps(properties))
+    leaves = dict(_leaf_fields(properties))
+
+    for path, spec in leaves.items():
+        if path in faceted and spec["type"] in ORDINAL_TYPES:
+            spec["eager_global_ordinals"] = True
+        if path in DISPLAY_ONLY_FIELDS:
+            spec["index"] = False
+            if path not in faceted and path not in sortable:
+                spec["doc_values"] = False
+
+    sort_fields = [
+        (field, descending)
+        for field, descending in default_sort
+        if field in leaves and leaves[field]["type"] in SORTABLE_TYPES and leaves[field].get("doc_values", True)
+    ]
+    sort_settings = {}
+    if sort_fields:
+        sort_settings = {
+            "index.sort.field": [field for field, _ in sort_fields],
+            "index.sort.order": ["desc" if descending else "asc" for _, descending in sort_fields],
+        }
+    return properties, sort_settings
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Local Elasticsearch stand-in for importer benchmarks.
+
+Usage:
+    python scripts/benchmark_es_server.py [--port 9250]
+
+Then point the importer at it:
+    ES_HOSTS=http://localhost:9250 python scripts/import_csv.py ./data/cohorts.csv
+
+Implements just enough of the REST API for import_csv.py (ping, index
+create/exists/delete, settings, _bulk, _refresh, _count, _forcemerge, cluster
+health). Bulk bodies are acknowledged without being stored; only document
+counts are kept. Every request is recorded (count, bytes, handling time) and
+the totals are served at GET /_benchmark/stats (POST /_benchmark/reset clears them).
+"""
+
+import argparse
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+VERSION = {"number": "7.17.0", "build_flavor": "default", "lucene_version": "8.11.1"}
+
+
+class BenchmarkState:
+    """Index document counts and per-endpoint request timings."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indices: Dict[str, int] = {}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = defaultdict(lambda: {"count": 0, "bytes": 0, "seconds": 0.0})
+
+    def record(self, endpoint: str, size: int, seconds: float):
+        with self.lock:
+            stats = self.requests[endpoint]
+            stats["count"] += 1
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {"requests": dict(self.requests), "indices": dict(self.indices)}
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed-ACK stalls on keep-alive
+    disable_nagle_algorithm = True
+    state: BenchmarkState
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: Optional[Any] = None):
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    def _bulk(self, default_index: Optional[str], body: bytes) -> Tuple[int, Dict[str, Any]]:
+        items = []
+        lines = iter(body.splitlines())
+        for line in lines:
+            if not line.strip():
+                continue
+            op, meta = next(iter(json.loads(line).items()))
+            index = meta.get("_index", default_index)
+            if op != "delete":
+                next(lines, None)
+            with self.state.lock:
+                count = self.state.indices.setdefault(index, 0)
+                self.state.indices[index] = count + (-1 if op == "delete" else 1)
+            items.append({op: {"_index": index, "_id": meta.get("_id"), "status": 201, "result": "created"}})
+        return 200, {"took": 0, "errors": False, "items": items}
+
+    def _route(self, body: bytes) -> Tuple[str, int, Optional[Any]]:
+        path = self.path.split("?")[0].strip("/")
+        parts = path.split("/") if path else []
+        if not parts:
+            return "/", 200, {"name": "benchmark", "version": VERSION, "tagline": "You Know, for Search"}
+        if parts[0] == "_benchmark":
+            if parts[-1] == "reset":
+                self.state.reset()
+                return "_benchmark", 200, {"acknowledged": True}
+            return "_benchmark", 200, self.state.stats()
+        if parts[-1] == "_bulk":
+            return ("_bulk",) + self._bulk(parts[0] if len(parts) > 1 else None, body)
+        if parts[0] == "_cluster":
+            return "_cluster/health", 200, {"status": "green", "timed_out": False}
+
+        index = parts[0]
+        endpoint = parts[1] if len(parts) > 1 else "index"
+        with self.state.lock:
+            exists = index in self.state.indices
+            if endpoint == "index":
+                if self.command == "HEAD":
+                    return endpoint, 200 if exists else 404, None
+                if self.command == "PUT":
+                    if exists:
+                        return endpoint, 400, {"error": {"type": "resource_already_exists_exception"}, "status": 400}
+                    self.state.indices[index] = 0
+                    return endpoint, 200, {"acknowledged": True, "index": index}
+                if self.command == "DELETE":
+                    self.state.indices.pop(index, None)
+                    return endpoint, 200, {"acknowledged": True}
+            if endpoint == "_count":
+                return endpoint, 200, {"count": self.state.indices.get(index, 0)}
+        if endpoint in ("_refresh", "_forcemerge", "_flush"):
+            return endpoint, 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if endpoint == "_settings":
+            return endpoint, 200, {"acknowledged": True}
+        return endpoint, 400, {"error": f"unsupported request {self.command} {self.path}", "status": 400}
+
+    def _handle(self):
+        start = time.perf_counter()
+        body = self._body()
+        endpoint, status, response = self._route(body)
+        self._reply(status, response)
+        if endpoint != "_benchmark":
+            self.state.record(endpoint, len(body), time.perf_counter() - start)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = _handle
+
+
+def start_server(port: int = 0, host: str = "127.0.0.1") -> Tuple[ThreadingHTTPServer, BenchmarkState]:
+    """Start the stand-in on a background thread; port 0 picks a free port."""
+    state = BenchmarkState()
+    handler = type("Handler", (BulkHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Elasticsearch bulk endpoint stand-in")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=9250, help="Port to listen on (default: 9250)")
+    args = parser.parse_args()
+
+    server, _ = start_server(args.port, args.host)
+    print(f"🔗 Elasticsearch stand-in listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Importer benchmark suite.
+
+Usage:
+    python scripts/benchmark_import.py [--rows N ...] [--modes MODE ...] [--output results.json]
+                                       [--baseline results.json [--max-regression RATIO]]
+
+Example:
+    python scripts/benchmark_import.py --rows 1000 100000 1000000
+    python scripts/benchmark_import.py --rows 100000 --baseline main.json --max-regression 0.2
+
+For every catalog size a synthetic catalog is generated (benchmark_catalog.py)
+and import_csv.py is run once per importer mode, in its own process, with the
+mode's flags and --metrics-json against the local bulk stand-in
+(benchmark_es_server.py). Parse, transform, serialize and bulk times, rows/sec
+and peak RSS are reported per mode from those metrics. With --baseline, the run fails if
+any mode's rows/sec dropped by more than --max-regression.
+"""
+
+import os
+import sys
+import argparse
+import contextlib
+import json
+import subprocess
+import tempfile
+from typing import Any, Dict, List
+
+# Importer options per benchmark mode
+MODES: Dict[str, Dict[str, Any]] = {
+    "row": {"engine": "row"},
+    "columnar": {"engine": "columnar"},
+    "columnar-stream": {"engine": "columnar", "chunk_size": 50000},
+    "columnar-parallel": {"engine": "columnar", "chunk_size": 50000, "workers": 4},
+    "columnar-async": {"engine": "columnar", "chunk_size": 50000, "workers": 4, "async": True},
+}
+# Stages of the importer's --metrics-json report (serialize and bulk overlap
+# with several workers, so they can add up to more than total_seconds)
+STAGES = ["parse", "transform", "serialize", "bulk", "refresh"]
+
+
+def mode_arguments(options: Dict[str, Any]) -> List[str]:
+    """import_csv.py flags of a benchmark mode."""
+    arguments = ["--engine", options["engine"]]
+    if options.get("chunk_size"):
+        arguments += ["--chunk-size", str(options["chunk_size"])]
+    if options.get("workers"):
+        arguments += ["--workers", str(options["workers"])]
+    if options.get("async"):
+        arguments.append("--async")
+    return arguments
+
+
+def run_mode(csv_file: str, es_url: str, index: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Run import_csv.main() with the mode's flags in this process and report its --metrics-json stages."""
+    os.environ["ES_HOSTS"] = es_url
+    import import_csv
+    from elasticsearch import Elasticsearch
+
+    with tempfile.TemporaryDirectory(prefix="import_benchmark_") as tmpdir:
+        metrics_file = os.path.join(tmpdir, "metrics.json")
+        argv = [csv_file, "--index", index, "--force", "--metrics-json", metrics_file] + mode_arguments(options)
+        # Keep stdout for the result line read by run_mode_subprocess()
+        with contextlib.redirect_stdout(sys.stderr):
+            import_csv.main(argv)
+        with open(metrics_file) as f:
+            metrics = json.load(f)
+
+    count = Elasticsearch([es_url]).count(index=index)["count"]
+    stages = metrics["stages"]
+    counters = metrics["counters"]
+    return {
+        "rows": metrics["rows"],
+        "documents": counters.get("documents_indexed", 0) + counters.get("documents_failed", 0),
+        "indexed": counters.get("documents_indexed", 0),
+        "failed": counters.get("documents_failed", 0),
+        "count": count,
+        "seconds": {stage: stages.get(stage, {}).get("seconds", 0.0) for stage in STAGES},
+        "total_seconds": metrics["wall_seconds"],
+        "rows_per_sec": metrics["rows_per_sec"],
+        "peak_rss_mb": metrics["peak_rss_mb"],
+    }
+
+
+def run_mode_subprocess(csv_file: str, es_url: str, index: str, mode: str) -> Dict[str, Any]:
+    """Run a mode in a fresh interpreter so peak RSS is measured per mode."""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, csv_file, es_url, index],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_regressions(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], max_regression: float):
+    """Return descriptions of modes whose rows/sec dropped more than max_regression."""
+    previous = {(r["rows"], r["mode"]): r["rows_per_sec"] for r in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["rows"], result["mode"]))
+        if before and result["rows_per_sec"] < before * (1 - max_regression):
+            regressions.append(
+                f"{result['mode']} @ {result['rows']} rows: "
+                f"{result['rows_per_sec']:,.0f} rows/sec vs {before:,.0f} baseline"
+            )
+    return regressions
+
+
+def print_table(results: List[Dict[str, Any]]):
+    header = f"{'rows':>9} {'mode':<18}" + "".join(f"{stage:>10}" for stage in STAGES)
+    header += f"{'rows/sec':>12}{'RSS MB':>9}{'server':>9}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        line = f"{r['rows']:>9} {r['mode']:<18}" + "".join(f"{r['seconds'][s]:>10.3f}" for s in STAGES)
+        line += f"{r['rows_per_sec']:>12,.0f}{r['peak_rss_mb']:>9.1f}{r['server_bulk_seconds']:>9.3f}"
+        print(line)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        mode, csv_file, es_url, index = sys.argv[2:6]
+        print(json.dumps(run_mode(csv_file, es_url, index, MODES[mode])))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark import_csv.py modes")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Catalog sizes to benchmark (default: 1000 10000 100000)")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=list(MODES),
+                        help="Importer modes to run (default: all)")
+    parser.add_argument("--workdir", default=None, help="Directory for generated catalogs (default: temp dir)")
+    parser.add_argument("--output", default=None, help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Results JSON of a previous run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed rows/sec drop against --baseline (default: 0.2)")
+    args = parser.parse_args()
+
+    from benchmark_catalog import write_catalog
+    from benchmark_es_server import start_server
+
+    server, state = start_server()
+    es_url = f"http://127.0.0.1:{server.server_address[1]}"
+    workdir = args.workdir or tempfile.mkdtemp(prefix="import_benchmark_")
+    os.makedirs(workdir, exist_ok=True)
+    print(f"🔗 Bulk stand-in: {es_url}")
+    print(f"📁 Catalogs: {workdir}\n")
+
+    results = []
+    for rows in args.rows:
+        csv_file = os.path.join(workdir, f"catalog_{rows}.csv")
+        if not os.path.exists(csv_file):
+            print(f"Generating {rows} synthetic cohorts...")
+            write_catalog(csv_file, rows)
+        for mode in args.modes:
+            print(f"Running {mode} on {rows} rows...")
+            state.reset()
+            result = run_mode_subprocess(csv_file, es_url, f"benchmark_{mode}_{rows}", mode)
+            bulk_stats = state.stats()["requests"].get("_bulk", {})
+            result.update({
+                "mode": mode,
+                "server_bulk_requests": bulk_stats.get("count", 0),
+                "server_bulk_bytes": bulk_stats.get("bytes", 0),
+                "server_bulk_seconds": round(bulk_stats.get("seconds", 0.0), 4),
+            })
+            results.append(result)
+    server.shutdown()
+
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📄 Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = check_regressions(results, json.load(f), args.max_regression)
+        if regressions:
+            print("\n❌ Throughput regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\n✅ No mode regressed more than {args.max_regression:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
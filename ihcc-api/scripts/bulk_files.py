@@ -0,0 +1,220 @@
+"""
+Offline _bulk files for the cohort importer.
+
+Export: transformed cohort documents are streamed into pre-chunked NDJSON
+_bulk bodies (part-00001.ndjson.gz, ...), each bounded by a document count and
+an uncompressed byte size, plus a manifest.json describing the parts. Action
+lines carry no _index, so one export can be loaded into any index or cluster.
+
+Load: the parts of an export directory are replayed concurrently, one _bulk
+request per part. Gzip parts are sent as they are with Content-Encoding: gzip;
+zstd parts are decompressed first. Requests and documents rejected with 429
+are retried with exponential backoff.
+
+Requires zstandard (pip install zstandard) for zstd parts.
+"""
+
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from elasticsearch import Elasticsearch, TransportError
+
+MANIFEST_NAME = "manifest.json"
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+
+DEFAULT_EXPORT_DOCS = 5000
+DEFAULT_EXPORT_BYTES = 10 * 1024 * 1024
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd bulk files require zstandard (pip install zstandard)")
+    return zstandard
+
+
+def compress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if compression == "zstd":
+        return _zstandard().ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: str) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        return _zstandard().ZstdDecompressor().decompress(data)
+    return data
+
+
+def _action_lines(action: Dict[str, Any]) -> bytes:
+    # Same encoding as the client's JSONSerializer
+    meta = {"_id": action["_id"]} if "_id" in action else {}
+    lines = json.dumps({"index": meta}, separators=(",", ":"))
+    lines += "\n" + json.dumps(action["_source"], separators=(",", ":"), ensure_ascii=False, default=str)
+    return (lines + "\n").encode("utf-8")
+
+
+class BulkFileWriter:
+    """Writes bulk actions into size-bounded, compressed _bulk NDJSON parts."""
+
+    def __init__(
+        self,
+        directory: str,
+        compression: str = "gzip",
+        max_docs: int = DEFAULT_EXPORT_DOCS,
+        max_bytes: int = DEFAULT_EXPORT_BYTES,
+    ):
+        if compression == "zstd":
+            _zstandard()
+        self.directory = directory
+        self.compression = compression
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.parts: List[Dict[str, Any]] = []
+        self._buffer: List[bytes] = []
+        self._buffer_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def add(self, action: Dict[str, Any]):
+        lines = _action_lines(action)
+        if self._buffer and self._buffer_bytes + len(lines) > self.max_bytes:
+            self.flush()
+        self._buffer.append(lines)
+        self._buffer_bytes += len(lines)
+        if len(self._buffer) >= self.max_docs:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        name = f"part-{len(self.parts) + 1:05d}.ndjson{COMPRESSION_SUFFIXES[self.compression]}"
+        data = compress(b"".join(self._buffer), self.compression)
+        with open(os.path.join(self.directory, name), "wb") as f:
+            f.write(data)
+        self.parts.append({
+            "file": name,
+            "documents": len(self._buffer),
+            "bytes": self._buffer_bytes,
+            "compressed_bytes": len(data),
+        })
+        self._buffer, self._buffer_bytes = [], 0
+
+    def close(self, source: Optional[str] = None, index_body: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the last part and the manifest; returns the manifest."""
+        self.flush()
+        manifest = {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "source": source,
+            "compression": self.compression,
+            "documents": sum(part["documents"] for part in self.parts),
+            "index_body": index_body,
+            "parts": self.parts,
+        }
+        with open(os.path.join(self.directory, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def read_manifest(directory: str) -> Dict[str, Any]:
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def _send(es: Elasticsearch, index: str, body: bytes, gzipped: bool) -> Dict[str, Any]:
+    headers = {"Content-Type": "application/x-ndjson"}
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return es.transport.perform_request("POST", f"/{index}/_bulk", headers=headers, body=body)
+
+
+def load_part(
+    es: Elasticsearch,
+    directory: str,
+    part: Dict[str, Any],
+    compression: str,
+    index: str,
+    max_retries: int,
+    initial_backoff: float,
+    max_backoff: float,
+) -> Tuple[int, int, List[Dict[str, Any]]]:
+    """Send one part; returns (success, failed, errors of failed items)."""
+    with open(os.path.join(directory, part["file"]), "rb") as f:
+        data = f.read()
+    gzipped = compression == "gzip"
+    if not gzipped:
+        data = decompress(data, compression)
+    lines: Optional[List[bytes]] = None
+
+    success, errors = 0, []
+    for attempt in range(max_retries + 1):
+        if attempt:
+            time.sleep(min(max_backoff, initial_backoff * 2 ** (attempt - 1)))
+        try:
+            response = _send(es, index, data, gzipped)
+        except TransportError as e:
+            if e.status_code != 429 or attempt == max_retries:
+                raise
+            continue
+
+        retry = []
+        for position, item in enumerate(response["items"]):
+            info = next(iter(item.values()))
+            status = info.get("status", 500)
+            if 200 <= status < 300:
+                success += 1
+            elif status == 429 and attempt < max_retries:
+                retry.append(position)
+            else:
+                errors.append(info)
+        if not retry:
+            break
+        # Re-send only the rejected documents, uncompressed
+        if lines is None:
+            lines = (decompress(data, compression) if gzipped else data).splitlines(keepends=True)
+        data = b"".join(lines[2 * p] + lines[2 * p + 1] for p in retry)
+        lines, gzipped = data.splitlines(keepends=True), False
+    return success, len(errors), errors
+
+
+def load_bulk_files(
+    es: Elasticsearch,
+    directory: str,
+    index: str,
+    workers: int = 4,
+    max_retries: int = 5,
+    initial_backoff: float = 2.0,
+    max_backoff: float = 600.0,
+) -> Tuple[int, int]:
+    """
+    Replay an export directory into index with concurrent uploads; returns
+    (success, failed). es must not be created with http_compress, or gzip
+    parts would be compressed a second time.
+    """
+    manifest = read_manifest(directory)
+    success = failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                load_part, es, directory, part, manifest["compression"], index,
+                max_retries, initial_backoff, max_backoff,
+            )
+            for part in manifest["parts"]
+        ]
+        for number, future in enumerate(futures, 1):
+            ok, bad, errors = future.result()
+            success += ok
+            failed += bad
+            print(
+                f"  Part {number}/{len(futures)}: {ok} indexed"
+                + (f", {bad} failed ({errors[0].get('error')})" if bad else "")
+            )
+    return success, failed
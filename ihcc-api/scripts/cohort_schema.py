@@ -0,0 +1,192 @@
+"""
+Declarative cohort document schema.
+
+The single definition of the cohort catalog document: top-level fields, nested
+groups, field types, list separators and the flat CSV column aliases. It is
+compiled into:
+
+- the Elasticsearch mapping (mapping_properties)
+- positional column accessors for the CSV importer (compile_accessors)
+- the flat CSV layout written by the discovery CatalogWriter (flatten_document)
+
+Kept free of third-party imports so the NVFlare server side can use it too.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+LIST_SEPARATOR = "|"
+
+# Elasticsearch type used for each parser unless a field overrides it
+PARSER_ES_TYPES = {
+    "value": "keyword",
+    "boolean": "boolean",
+    "integer": "integer",
+    "list": "keyword",
+}
+
+
+class Field(NamedTuple):
+    """A document field and the CSV columns it is read from, in priority order."""
+
+    name: str
+    columns: Tuple[str, ...]
+    parser: str = "value"
+    es_type: Optional[str] = None
+    separator: str = LIST_SEPARATOR
+
+    @property
+    def mapping_type(self) -> str:
+        return self.es_type or PARSER_ES_TYPES[self.parser]
+
+
+class Group(NamedTuple):
+    """A nested object; emitted only when required_field (if set) has a value."""
+
+    name: str
+    fields: Tuple[Field, ...]
+    required_field: Optional[str] = None
+
+
+def _prefixed(prefix: str, names: Sequence[str], parser: str = "value") -> Tuple[Field, ...]:
+    return tuple(Field(name, (f"{prefix}_{name}",), parser) for name in names)
+
+
+TOP_LEVEL_FIELDS: Tuple[Field, ...] = (
+    Field("cohort_name", ("cohort_name", "name")),
+    Field("pi_lead", ("pi_lead", "pi"), es_type="text"),
+    Field("website", ("website",)),
+    Field("dictionary_harmonized", ("dictionary_harmonized",), "boolean"),
+    Field("irb_approved_data_sharing", ("irb_approved_data_sharing",)),
+    Field("countries", ("countries",), "list"),
+    Field("current_enrollment", ("current_enrollment",), "integer"),
+    Field("target_enrollment", ("target_enrollment",), "integer"),
+    Field("enrollment_period", ("enrollment_period",)),
+)
+
+GROUPS: Tuple[Group, ...] = (
+    Group("available_data_types", tuple(
+        # Data type columns are accepted with or without the group prefix
+        Field(name, (name, f"available_data_types_{name}"))
+        for name in (
+            "biospecimens",
+            "genomic_data",
+            "genomic_data_wgs",
+            "genomic_data_wes",
+            "genomic_data_array",
+            "genomic_data_other",
+            "demographic_data",
+            "imaging_data",
+            "participants_address_or_geocode_data",
+            "electronic_health_record_data",
+            "phenotypic_clinical_data",
+        )
+    )),
+    Group(
+        "biosample",
+        _prefixed("biosample", ("sample_types", "biosample_variables"), "list"),
+        required_field="sample_types",
+    ),
+    Group("cohort_ancestry", _prefixed("cohort_ancestry", (
+        "asian",
+        "black_african_american_or_african",
+        "european_or_white",
+        "hispanic_latino_or_spanish",
+        "middle_eastern_or_north_african",
+        "other",
+    ))),
+    Group("type_of_cohort", _prefixed("type_of_cohort", (
+        "case_control",
+        "cross_sectional",
+        "longitudinal",
+        "health_records",
+        "other",
+    ))),
+    Group("questionnaire_survey_data", _prefixed("questionnaire_survey_data", (
+        "diseases",
+        "healthcare_information",
+        "lifestyle_and_behaviours",
+        "medication",
+        "non_pharmacological_interventions",
+        "perception_of_health_and_quality_of_life",
+        "physical_environment",
+        "physiological_measurements",
+        "socio_demographic_and_economic_characteristics",
+        "survey_administration",
+        "other_questionnaire_survey_data",
+    ), "list")),
+    Group("laboratory_measures", _prefixed("laboratory_measures", (
+        "genomic_variables",
+        "microbiology",
+    ), "list")),
+)
+
+
+def source_columns() -> List[str]:
+    """Every CSV column the schema reads, aliases included."""
+    columns = [column for field in TOP_LEVEL_FIELDS for column in field.columns]
+    for group in GROUPS:
+        columns.extend(column for field in group.fields for column in field.columns)
+    return columns
+
+
+def mapping_properties() -> Dict[str, Any]:
+    """Elasticsearch mapping properties for the cohort document."""
+    properties: Dict[str, Any] = {
+        field.name: {"type": field.mapping_type} for field in TOP_LEVEL_FIELDS
+    }
+    for group in GROUPS:
+        properties[group.name] = {
+            "properties": {field.name: {"type": field.mapping_type} for field in group.fields}
+        }
+    return properties
+
+
+# (document key, positions of the candidate columns present, field)
+Accessor = Tuple[str, Tuple[int, ...], Field]
+
+
+def _accessors(fields: Sequence[Field], positions: Dict[str, int]) -> List[Accessor]:
+    accessors = []
+    for field in fields:
+        present = tuple(positions[column] for column in field.columns if column in positions)
+        if present:
+            accessors.append((field.name, present, field))
+    return accessors
+
+
+def compile_accessors(
+    columns: Sequence[str],
+) -> Tuple[List[Accessor], List[Tuple[Group, List[Accessor]]]]:
+    """
+    Resolve the schema against a header once: every field becomes the
+    positions of its candidate columns, and fields/groups with no column in
+    the header are dropped so per-row work only touches existing data.
+    """
+    positions: Dict[str, int] = {}
+    for position, column in enumerate(columns):
+        positions.setdefault(column, position)
+    groups = [(group, _accessors(group.fields, positions)) for group in GROUPS]
+    return (
+        _accessors(TOP_LEVEL_FIELDS, positions),
+        [(group, accessors) for group, accessors in groups if accessors],
+    )
+
+
+def flatten_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flatten a nested cohort document into the CSV layout read by the importer:
+    each field goes to its primary column and lists are joined with their separator.
+    """
+    def flat_value(field: Field, value: Any) -> Any:
+        if field.parser == "list" and isinstance(value, list):
+            return field.separator.join(str(item) for item in value)
+        return value
+
+    flat = {
+        field.columns[0]: flat_value(field, doc.get(field.name)) for field in TOP_LEVEL_FIELDS
+    }
+    for group in GROUPS:
+        values = doc.get(group.name) or {}
+        for field in group.fields:
+            flat[field.columns[0]] = flat_value(field, values.get(field.name))
+    return flat
@@ -0,0 +1,115 @@
+"""
+Precomputed dashboard aggregates for the cohort catalog.
+
+The importer feeds every cohort document through a DashboardRollup while it
+streams them into the main index. The rollup keeps per-facet cohort counts
+(countries, biosample sample types, ancestry buckets, data-type availability,
+cohort-type flags) and the biosample-to-data-type co-occurrence matrix behind
+the Sankey chart, and is written to a small rollup index at the end of the
+import so charts can read counts instead of aggregating on every page view.
+Counts come from the imported file, so the file has to describe the whole
+index: incremental imports only write a rollup together with --delete-missing.
+
+Rollup document shapes:
+    {"kind": "total", "count": 1234}
+    {"kind": "facet", "facet": "countries", "value": "Canada", "count": 87}
+    {"kind": "cooccurrence", "source": "Blood", "target": "genomic_data", "count": 40}
+"""
+
+import hashlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, Iterator
+
+# Nested groups whose every field is rolled up as "<group>.<field>" facets
+ROLLUP_GROUPS = ["available_data_types", "cohort_ancestry", "type_of_cohort"]
+
+# Data-type values that mean the data type is not available
+UNAVAILABLE_VALUES = {"no", "0%", "false", "none"}
+
+
+def rollup_index_mapping() -> Dict[str, Any]:
+    return {
+        "settings": {
+            "number_of_shards": 1,
+            "number_of_replicas": 0,
+        },
+        "mappings": {
+            "properties": {
+                "kind": {"type": "keyword"},
+                "facet": {"type": "keyword"},
+                "value": {"type": "keyword"},
+                "source": {"type": "keyword"},
+                "target": {"type": "keyword"},
+                "count": {"type": "integer"},
+                "generated_at": {"type": "keyword"},
+            }
+        },
+    }
+
+
+def _is_available(value: Any) -> bool:
+    return str(value).strip().lower() not in UNAVAILABLE_VALUES
+
+
+class DashboardRollup:
+    """Facet counts and co-occurrences accumulated one cohort document at a time."""
+
+    def __init__(self):
+        self.cohorts = 0
+        self.facets: Dict[str, Counter] = defaultdict(Counter)
+        self.cooccurrence: Counter = Counter()
+
+    def add(self, doc: Dict[str, Any]):
+        self.cohorts += 1
+        for country in set(doc.get("countries") or []):
+            self.facets["countries"][country] += 1
+
+        sample_types = set((doc.get("biosample") or {}).get("sample_types") or [])
+        for sample_type in sample_types:
+            self.facets["biosample.sample_types"][sample_type] += 1
+
+        for group in ROLLUP_GROUPS:
+            for field, value in (doc.get(group) or {}).items():
+                self.facets[f"{group}.{field}"][str(value)] += 1
+
+        available = [
+            data_type
+            for data_type, value in (doc.get("available_data_types") or {}).items()
+            if _is_available(value)
+        ]
+        for sample_type in sample_types:
+            for data_type in available:
+                self.cooccurrence[(sample_type, data_type)] += 1
+
+    def observe(self, actions: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass bulk actions through unchanged, adding each _source to the rollup."""
+        for action in actions:
+            self.add(action["_source"])
+            yield action
+
+    def documents(self) -> Iterator[Dict[str, Any]]:
+        yield {"kind": "total", "count": self.cohorts}
+        for facet, counts in sorted(self.facets.items()):
+            for value, count in counts.items():
+                yield {"kind": "facet", "facet": facet, "value": value, "count": count}
+        for (source, target), count in sorted(self.cooccurrence.items()):
+            yield {"kind": "cooccurrence", "source": source, "target": target, "count": count}
+
+    def actions(self, index: str, generated_at: str) -> Iterator[Dict[str, Any]]:
+        """
+        Bulk actions with IDs stable across imports, so rewriting the rollup
+        replaces counts in place instead of emptying the index first.
+        """
+        for doc in self.documents():
+            key = "|".join(str(doc.get(part, "")) for part in ("kind", "facet", "value", "source", "target"))
+            yield {
+                "_index": index,
+                "_id": hashlib.sha1(key.encode("utf-8")).hexdigest(),
+                "_source": {**doc, "generated_at": generated_at},
+            }
+
+
+def stale_rollup_query(generated_at: str) -> Dict[str, Any]:
+    """Query matching rollup documents left over from earlier imports."""
+    return {"query": {"bool": {"must_not": {"term": {"generated_at": generated_at}}}}}
+
@@ -0,0 +1,221 @@
+"""
+Resumable imports for the cohort importer.
+
+An ImportCheckpoint follows every bulk action from the chunk it was read in to
+its acknowledgement. Once all documents of a chunk (and of every chunk before
+it) have been acknowledged, the number of input records done is written to the
+checkpoint file, so an interrupted import can continue with --resume instead of
+starting over. Documents Elasticsearch rejected are appended, with status and
+error reason, to an NDJSON dead-letter file that --retry-dead-letter re-sends.
+
+Checkpoint file:
+    {"input_file": "/data/cohorts.csv", "size": 123, "mtime_ns": 456,
+     "index": "cohort_centric", "chunk_size": 50000, "chunk": 3, "rows": 150000}
+
+Dead-letter line:
+    {"_index": "cohort_centric", "_id": "...", "status": 400,
+     "error": {...}, "chunk": 4, "source": {...}}
+
+Actions are matched to results by _id, so documents get a stable _id derived
+from the input file's identity and their row position (unless an earlier
+stage, e.g. --incremental, set one); replaying a partially acknowledged chunk
+then overwrites instead of duplicating, while other catalogs imported into the
+same index keep their own documents.
+
+The action stream may be read on another thread than the one results are
+acknowledged on (--async, parallel_bulk workers), so chunk bookkeeping is
+guarded by a lock.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Default checkpoint and dead-letter file names: <catalog-file><suffix>
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+DEAD_LETTER_SUFFIX = ".dead-letter.ndjson"
+
+
+class CheckpointMismatch(Exception):
+    """The checkpoint was written for a different input file."""
+
+
+def _file_identity(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"input_file": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoint(path: str, input_file: str) -> Dict[str, Any]:
+    """Read a checkpoint and check it still describes input_file."""
+    with open(path) as f:
+        state = json.load(f)
+    identity = _file_identity(input_file)
+    for key, value in identity.items():
+        if state.get(key) != value:
+            raise CheckpointMismatch(
+                f"checkpoint {path} was written for a different version of the input "
+                f"({key}: {state.get(key)!r} != {value!r})"
+            )
+    return state
+
+
+def read_dead_letter(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def dead_letter_actions(entries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Bulk actions re-sending dead-letter entries to the index they failed on."""
+    for entry in entries:
+        yield {"_index": entry["_index"], "_id": entry["_id"], "_source": entry["source"]}
+
+
+class ImportCheckpoint:
+    """Chunk acknowledgement tracking, checkpoint file and dead-letter writer."""
+
+    def __init__(
+        self,
+        checkpoint_path: Optional[str],
+        dead_letter_path: str,
+        state: Dict[str, Any],
+        append_dead_letter: bool = False,
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.state = dict(state)
+        self.state.setdefault("chunk", 0)
+        self.state.setdefault("rows", 0)
+        self.dead_letter_path = dead_letter_path
+        # On resume, unacknowledged chunks are replayed: their rejections are
+        # already in the dead-letter file and must not be written twice
+        self._dead_letter_ids = set()
+        if append_dead_letter and os.path.exists(dead_letter_path):
+            self._dead_letter_ids = {entry["_id"] for entry in read_dead_letter(dead_letter_path)}
+        self.dead_letter = open(dead_letter_path, "a" if append_dead_letter else "w")
+        self.dead_letters = len(self._dead_letter_ids)
+        self.finished = False
+        # chunk number -> [rows read once the chunk is done, outstanding actions, fully emitted]
+        self.chunks: "OrderedDict[int, List[Any]]" = OrderedDict()
+        self.current_chunk: Optional[int] = None
+        self.pending: Dict[str, deque] = defaultdict(deque)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def start(
+        cls, checkpoint_path: str, dead_letter_path: str, input_file: str, index: str,
+        chunk_size: Optional[int],
+    ) -> "ImportCheckpoint":
+        state = {**_file_identity(input_file), "index": index, "chunk_size": chunk_size}
+        checkpoint = cls(checkpoint_path, dead_letter_path, state)
+        checkpoint.save()
+        return checkpoint
+
+    @classmethod
+    def resume(cls, checkpoint_path: str, dead_letter_path: str, input_file: str) -> "ImportCheckpoint":
+        state = load_checkpoint(checkpoint_path, input_file)
+        return cls(checkpoint_path, dead_letter_path, state, append_dead_letter=True)
+
+    @property
+    def rows(self) -> int:
+        return self.state["rows"]
+
+    @property
+    def chunk(self) -> int:
+        return self.state["chunk"]
+
+    def row_key(self, position: int) -> str:
+        """Key of the record at position of this checkpoint's input file, for document_id()."""
+        return f"{self.state['input_file']}:{self.state['size']}:{self.state['mtime_ns']}:row:{position}"
+
+    def save(self):
+        if not self.checkpoint_path:
+            return
+        self.state["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def begin_chunk(self, number: int, rows_end: int):
+        """Called before the first action of a chunk; every earlier chunk is fully emitted."""
+        with self._lock:
+            self._close_current()
+            self.chunks[number] = [rows_end, 0, False]
+            self.current_chunk = number
+
+    def end_input(self):
+        with self._lock:
+            self._close_current()
+
+    def _close_current(self):
+        if self.current_chunk is not None:
+            self.chunks[self.current_chunk][2] = True
+            self._advance()
+
+    def _advance(self):
+        advanced = False
+        while self.chunks:
+            number, (rows_end, outstanding, closed) = next(iter(self.chunks.items()))
+            if outstanding or not closed:
+                break
+            self.chunks.popitem(last=False)
+            self.state.update(chunk=number, rows=rows_end)
+            advanced = True
+        if advanced:
+            self.dead_letter.flush()
+            self.save()
+
+    def track(self, actions: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Pass the final action stream through, remembering each action until acknowledged."""
+        for action in actions:
+            with self._lock:
+                self.pending[action["_id"]].append((self.current_chunk, action))
+                self.chunks[self.current_chunk][1] += 1
+            yield action
+
+    def acknowledge(self, ok: bool, item: Dict[str, Any]):
+        """index_actions() result callback."""
+        _, info = next(iter(item.items()))
+        with self._lock:
+            queue = self.pending.get(info.get("_id"))
+            if not queue:
+                return
+            number, action = queue.popleft()
+            if not queue:
+                del self.pending[info["_id"]]
+            if not ok:
+                self.write_dead_letter(action, info, number)
+            self.chunks[number][1] -= 1
+            self._advance()
+
+    def write_dead_letter(self, action: Dict[str, Any], info: Dict[str, Any], chunk: Optional[int] = None):
+        if action["_id"] in self._dead_letter_ids:
+            return
+        self._dead_letter_ids.add(action["_id"])
+        entry = {
+            "_index": action["_index"],
+            "_id": action["_id"],
+            "status": info.get("status"),
+            "error": info.get("error"),
+            "chunk": chunk,
+            "source": action.get("_source"),
+        }
+        self.dead_letter.write(json.dumps(entry, default=str) + "\n")
+        self.dead_letters += 1
+
+    def finish(self):
+        """Import ran to the end: the checkpoint is no longer needed."""
+        self.finished = True
+        self.close()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def close(self):
+        """Flush the dead-letter file, removing it if nothing was ever rejected."""
+        if self.dead_letter.closed:
+            return
+        self.dead_letter.close()
+        if os.path.getsize(self.dead_letter_path) == 0:
+            os.remove(self.dead_letter_path)
@@ -2,28 +2,165 @@
 """
 CSV to Elasticsearch Import Utility (Python Version)
 
+Also reads nested cohort catalogs as JSON arrays (cohort_catalog.json) or
+NDJSON streams, which skip the CSV flatten/parse round trip, and Parquet or
+Arrow IPC/Feather tables, which are memory-mapped and column-projected.
+
+Several catalogs (files, glob patterns or directories) can be imported at
+once: files are read and transformed in a process pool and feed one shared
+bulk indexing stage.
+
 Usage:
-    python scripts/import_csv.py <csv-file-path> [--index <index-name>]
+    python scripts/import_csv.py <catalog-file-path> [<catalog-file-path> ...] [--processes <n>]
+                                 [--index <index-name>] [--engine row|columnar]
+                                 [--format auto|csv|json|ndjson|parquet|arrow]
+                                 [--chunk-size <rows>] [--workers <n>] [--bulk-docs <n>]
+                                 [--bulk-bytes <bytes>] [--max-retries <n>]
+                                 [--async] [--connections <n>] [--http-compress] [--sniff]
+                                 [--alias-swap [--keep-generations <n>]]
+                                 [--incremental [--id-field <field>] [--delete-missing]]
+                                 [--bulk-load] [--force-merge] [--shards <n>] [--replicas <n>]
+                                 [--rollup [--rollup-index <index-name>]]
+                                 [--mapping-profile default|arranger [--arranger-metadata <path>]]
+                                 [--metrics-json <path>] [--metrics-prom <path>]
+                                 [--profile-transform <path>]
+                                 [--checkpoint] [--resume] [--retry-dead-letter]
+                                 [--checkpoint-file <path>] [--dead-letter-file <path>]
+                                 [--export-dir <dir> [--export-compression gzip|zstd|none]
+                                  [--export-docs <n>] [--export-bytes <bytes>]]
+    python scripts/import_csv.py <export-dir> --load-bulk-files [--index <index-name>] [--workers <n>]
 
 Example:
     python scripts/import_csv.py ./data/cohorts.csv
     python scripts/import_csv.py ./data/cohorts.csv --index cohort_centric
+    python scripts/import_csv.py "./sites/*/cohort_catalog.csv" ./discovery_runs/ --processes 8
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000 --workers 8 --bulk-docs 2000
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000 --async --workers 16 --sniff
+    python scripts/import_csv.py ./data/cohorts.csv --alias-swap --keep-generations 2
+    python scripts/import_csv.py ./data/cohorts.csv --incremental --delete-missing
+    python scripts/import_csv.py ./data/huge_catalog.csv --alias-swap --bulk-load --force-merge --replicas 1
+    python scripts/import_csv.py ./data/cohort_catalog.json
+    python scripts/import_csv.py ./data/cohorts.ndjson --chunk-size 10000
+    python scripts/import_csv.py ./data/cohorts.parquet --chunk-size 100000
+    python scripts/import_csv.py ./data/cohorts.csv --rollup
+    python scripts/import_csv.py ./data/cohorts.csv --force --mapping-profile arranger
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000 --metrics-json metrics.json \
+        --metrics-prom /var/lib/node_exporter/cohort_import.prom --profile-transform transform.prof
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000 --checkpoint
+    python scripts/import_csv.py ./data/huge_catalog.csv --resume
+    python scripts/import_csv.py ./data/huge_catalog.csv --retry-dead-letter
+    python scripts/import_csv.py ./data/huge_catalog.csv --chunk-size 50000 --export-dir ./export/cohorts
+    python scripts/import_csv.py ./export/cohorts --load-bulk-files --workers 8 --alias-swap
     
 Requirements:
     pip install elasticsearch pandas
+    pip install orjson  # optional, faster JSON/NDJSON decoding
+    pip install pyarrow  # optional, Parquet and Arrow/Feather catalogs
+    pip install zstandard  # optional, zstd-compressed bulk files
+    pip install aiohttp  # optional, --async mode
 """
 
 import sys
 import os
 import argparse
+import asyncio
+import glob
+import hashlib
+import itertools
+import json
+import multiprocessing
+import re
+import time
+from contextlib import nullcontext, suppress
+from datetime import datetime
+from functools import lru_cache
+from queue import Empty
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pandas as pd
-from typing import Dict, List, Any, Optional
+import numpy as np
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import scan, streaming_bulk
+
+from import_metrics import ImportMetrics
+from bulk_files import (
+    COMPRESSION_SUFFIXES,
+    DEFAULT_EXPORT_BYTES,
+    DEFAULT_EXPORT_DOCS,
+    BulkFileWriter,
+    load_bulk_files,
+    read_manifest,
+)
+from import_checkpoint import (
+    CHECKPOINT_SUFFIX,
+    DEAD_LETTER_SUFFIX,
+    CheckpointMismatch,
+    ImportCheckpoint,
+    dead_letter_actions,
+    read_dead_letter,
+)
+from arranger_mapping import (
+    DEFAULT_ARRANGER_METADATA,
+    aggregation_profile,
+    display_only_conflicts,
+    load_arranger_metadata,
+)
+from dashboard_rollup import DashboardRollup, rollup_index_mapping, stale_rollup_query
+from cohort_schema import (
+    GROUPS,
+    TOP_LEVEL_FIELDS,
+    Accessor,
+    compile_accessors,
+    mapping_properties,
+    source_columns,
+)
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 # Configuration
 ES_HOSTS = os.getenv("ES_HOSTS", "http://localhost:9200").split(",")
 DEFAULT_INDEX = os.getenv("COHORT_INDEX_NAME", "cohort_centric")
+DEFAULT_SHARDS = int(os.getenv("COHORT_INDEX_SHARDS", "1"))
+DEFAULT_REPLICAS = int(os.getenv("COHORT_INDEX_REPLICAS", "0"))
+DEFAULT_REFRESH_INTERVAL = os.getenv("COHORT_INDEX_REFRESH_INTERVAL", "1s")
+
+# Settings applied while --bulk-load writes: no periodic refreshes, no replica copies
+BULK_LOAD_SETTINGS = {"refresh_interval": "-1", "number_of_replicas": 0}
+
+# Bulk indexing defaults (match elasticsearch.helpers)
+DEFAULT_BULK_DOCS = 500
+DEFAULT_BULK_BYTES = 100 * 1024 * 1024
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_INITIAL_BACKOFF = 2.0
+DEFAULT_MAX_BACKOFF = 600.0
+
+# Versioned index generations written by --alias-swap: <alias>_YYYYMMDDTHHMMSS
+GENERATION_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+# Field holding the hash of each document's content for --incremental imports
+CONTENT_HASH_FIELD = "content_hash"
+
+# Catalog file formats by extension (--format auto)
+INPUT_FORMATS = {
+    ".csv": "csv",
+    ".json": "json",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+}
+
+TRUE_VALUES = ["true", "yes", "1"]
+FALSE_VALUES = ["false", "no", "0"]
 
 
 def parse_boolean(value: Any) -> Optional[bool]:
@@ -34,15 +171,18 @@ def parse_boolean(value: Any) -> Optional[bool]:
         return value
     if isinstance(value, str):
         lower_val = value.lower().strip()
-        if lower_val in ["true", "yes", "1"]:
+        if lower_val in TRUE_VALUES:
             return True
-        if lower_val in ["false", "no", "0"]:
+        if lower_val in FALSE_VALUES:
             return False
     return None
 
 
 def parse_list(value: Any, separator: str = "|") -> Optional[List[str]]:
-    """Parse list values from delimited strings."""
+    """Parse list values from delimited strings (or clean up native list values)."""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        items = [str(item).strip() for item in value if not _is_missing(item)]
+        return [item for item in items if item]
     if pd.isna(value) or value == "":
         return None
     if isinstance(value, str):
@@ -57,7 +197,7 @@ def parse_integer(value: Any) -> Optional[int]:
         return None
     try:
         return int(float(value))
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError):
         return None
 
 
@@ -76,200 +216,1290 @@ def clean_dict(obj: Any) -> Any:
     return obj
 
 
+def _is_missing(value: Any) -> bool:
+    return (
+        value is None
+        or value is pd.NA
+        or (isinstance(value, float) and value != value)
+        or (isinstance(value, str) and value == "")
+    )
+
+
+# Per-cell parsers by schema parser name, called as parse(value, separator)
+_ROW_PARSERS = {
+    "value": lambda value, separator: value,
+    "boolean": lambda value, separator: parse_boolean(value),
+    "integer": lambda value, separator: parse_integer(value),
+    "list": lambda value, separator: parse_list(value, separator) or None,
+}
+
+
+def _row_accessors(accessors: List[Accessor]) -> List[Tuple[str, Tuple[int, ...], Any, str]]:
+    return [
+        (key, positions, _ROW_PARSERS[field.parser], field.separator)
+        for key, positions, field in accessors
+    ]
+
+
+def compile_row_transform(columns: List[str]):
+    """Compile the cohort schema against a header into positional row accessors."""
+    top_level, groups = compile_accessors(columns)
+    return (
+        _row_accessors(top_level),
+        [(group.name, _row_accessors(accessors), group.required_field) for group, accessors in groups],
+    )
+
+
+def _read_fields(values: Tuple[Any, ...], accessors) -> Dict[str, Any]:
+    fields = {}
+    for key, positions, parse, separator in accessors:
+        # First candidate column with a value wins (e.g. cohort_name before name)
+        for position in positions:
+            value = values[position]
+            if not _is_missing(value):
+                value = parse(value, separator)
+                if value is not None:
+                    fields[key] = value
+                break
+    return fields
+
+
+def build_document(values: Tuple[Any, ...], compiled) -> Dict[str, Any]:
+    """Build one document from a row of values laid out as the compiled header."""
+    top_level, groups = compiled
+    doc = _read_fields(values, top_level)
+    for name, accessors, required_field in groups:
+        nested = _read_fields(values, accessors)
+        if nested and (required_field is None or required_field in nested):
+            doc[name] = nested
+    return doc
+
+
+@lru_cache(maxsize=32)
+def _compiled_for_header(columns: Tuple[str, ...]):
+    return compile_row_transform(list(columns))
+
+
 def transform_row(row: pd.Series) -> Dict[str, Any]:
-    """Transform CSV row to Elasticsearch document."""
-    doc = {
-        "cohort_name": row.get("cohort_name") or row.get("name"),
-        "pi_lead": row.get("pi_lead") or row.get("pi"),
-        "website": row.get("website"),
-        "dictionary_harmonized": parse_boolean(row.get("dictionary_harmonized")),
-        "irb_approved_data_sharing": row.get("irb_approved_data_sharing"),
-        "countries": parse_list(row.get("countries")),
-        "current_enrollment": parse_integer(row.get("current_enrollment")),
-        "target_enrollment": parse_integer(row.get("target_enrollment")),
-        "enrollment_period": row.get("enrollment_period"),
-    }
+    """Transform CSV row to Elasticsearch document (schema compiled once per header)."""
+    return build_document(tuple(row.tolist()), _compiled_for_header(tuple(row.index)))
 
-    # Available data types (nested object)
-    doc["available_data_types"] = {
-        "biospecimens": row.get("biospecimens") or row.get("available_data_types_biospecimens"),
-        "genomic_data": row.get("genomic_data") or row.get("available_data_types_genomic_data"),
-        "genomic_data_wgs": row.get("genomic_data_wgs") or row.get("available_data_types_genomic_data_wgs"),
-        "genomic_data_wes": row.get("genomic_data_wes") or row.get("available_data_types_genomic_data_wes"),
-        "genomic_data_array": row.get("genomic_data_array") or row.get("available_data_types_genomic_data_array"),
-        "genomic_data_other": row.get("genomic_data_other") or row.get("available_data_types_genomic_data_other"),
-        "demographic_data": row.get("demographic_data") or row.get("available_data_types_demographic_data"),
-        "imaging_data": row.get("imaging_data") or row.get("available_data_types_imaging_data"),
-        "participants_address_or_geocode_data": row.get("participants_address_or_geocode_data") or row.get("available_data_types_participants_address_or_geocode_data"),
-        "electronic_health_record_data": row.get("electronic_health_record_data") or row.get("available_data_types_electronic_health_record_data"),
-        "phenotypic_clinical_data": row.get("phenotypic_clinical_data") or row.get("available_data_types_phenotypic_clinical_data"),
-    }
 
-    # Biosample (nested object)
-    biosample_types = parse_list(row.get("biosample_sample_types"))
-    if biosample_types:
-        doc["biosample"] = {
-            "sample_types": biosample_types,
-            "biosample_variables": parse_list(row.get("biosample_biosample_variables")),
-        }
-
-    # Cohort ancestry (nested object)
-    doc["cohort_ancestry"] = {
-        "asian": row.get("cohort_ancestry_asian"),
-        "black_african_american_or_african": row.get("cohort_ancestry_black_african_american_or_african"),
-        "european_or_white": row.get("cohort_ancestry_european_or_white"),
-        "hispanic_latino_or_spanish": row.get("cohort_ancestry_hispanic_latino_or_spanish"),
-        "middle_eastern_or_north_african": row.get("cohort_ancestry_middle_eastern_or_north_african"),
-        "other": row.get("cohort_ancestry_other"),
-    }
+# ---------------------------------------------------------------------------
+# Columnar transform engine
+#
+# Parses whole columns at once and resolves alias columns once per file, then
+# assembles the same nested documents as transform_row() without per-row
+# pandas lookups.
+# ---------------------------------------------------------------------------
+
+def _is_text(series: pd.Series) -> bool:
+    return series.dtype == object or isinstance(series.dtype, pd.StringDtype)
+
+
+def _decode_categorical(series: pd.Series) -> pd.Series:
+    # Arrow dictionary columns arrive as categoricals
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    return series
+
+
+def _resolve_column(df: pd.DataFrame, positions: Tuple[int, ...]) -> pd.Series:
+    """Coalesce alias columns: the first one with a value wins."""
+    resolved = None
+    for position in positions:
+        column = _decode_categorical(df.iloc[:, position])
+        if _is_text(column):
+            column = column.mask(_strings(column) == "")
+        resolved = column if resolved is None else resolved.where(resolved.notna(), column)
+    return resolved
+
+
+def _to_values(series: pd.Series) -> List[Any]:
+    """Column to Python list with missing cells as None."""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _strings(series: pd.Series) -> pd.Series:
+    """Mask every cell that is not a str (parse_* only accept strings)."""
+    if isinstance(series.dtype, pd.StringDtype):
+        return series
+    return series.where(series.map(type) == str)
+
+
+def parse_boolean_column(series: pd.Series) -> List[Optional[bool]]:
+    """Vectorized parse_boolean()."""
+    if series.dtype == bool:
+        return series.tolist()
+    result = pd.Series(None, index=series.index, dtype=object)
+    if _is_text(series):
+        lowered = _strings(series).str.strip().str.lower()
+        result[lowered.isin(TRUE_VALUES)] = True
+        result[lowered.isin(FALSE_VALUES)] = False
+        if series.dtype == object:
+            is_bool = series.map(type) == bool
+            result[is_bool] = series[is_bool]
+    return _to_values(result)
+
+
+def parse_integer_column(series: pd.Series) -> List[Optional[int]]:
+    """Vectorized parse_integer()."""
+    numbers = pd.to_numeric(series, errors="coerce").astype(float)
+    numbers = numbers.where(np.isfinite(numbers))
+    # Past 2**53 floats are inexact (and past 2**63 do not fit Int64):
+    # parse those rare cells one by one exactly like parse_integer()
+    oversized = numbers.abs() >= 2.0 ** 53
+    values = _to_values(np.trunc(numbers.mask(oversized)).astype("Int64"))
+    for position in np.flatnonzero(oversized.to_numpy()):
+        values[position] = parse_integer(series.iloc[position])
+    return values
+
+
+def parse_list_column(series: pd.Series, separator: str = "|") -> List[Optional[List[str]]]:
+    """Vectorized parse_list(): split, strip and drop empty items per cell."""
+    result: List[Optional[List[str]]] = [None] * len(series)
+    if not _is_text(series):
+        return result
+    series = series.reset_index(drop=True)
+    if series.dtype == object:
+        # Native list cells (Parquet/Arrow list columns) need no splitting
+        for position, value in enumerate(series.tolist()):
+            if isinstance(value, (list, tuple, np.ndarray)):
+                result[position] = parse_list(value) or None
+    text = _strings(series).dropna()
+    items = (
+        text.str.replace(";", separator, regex=False)
+        .str.split(separator, regex=False)
+        .explode()
+        .str.strip()
+    )
+    items = items[items.notna() & (items != "")]
+    # explode() keeps items of a cell contiguous: slice them back per position
+    positions = items.index.to_numpy()
+    values = items.tolist()
+    starts = np.flatnonzero(np.diff(positions, prepend=-1))
+    ends = np.append(starts[1:], len(values))
+    for position, start, end in zip(positions[starts].tolist(), starts.tolist(), ends.tolist()):
+        result[position] = values[start:end]
+    return result
+
+
+_COLUMN_PARSERS = {
+    "value": lambda series, separator: _to_values(series),
+    "boolean": lambda series, separator: parse_boolean_column(series),
+    "integer": lambda series, separator: parse_integer_column(series),
+    "list": parse_list_column,
+}
+
+
+def _parse_columns(df: pd.DataFrame, accessors: List[Accessor]) -> List[Tuple[str, List[Any]]]:
+    return [
+        (key, _COLUMN_PARSERS[field.parser](_resolve_column(df, positions), field.separator))
+        for key, positions, field in accessors
+    ]
+
+
+def _collect(parsed: List[Tuple[str, List[Any]]], i: int) -> Dict[str, Any]:
+    fields = {}
+    for key, values in parsed:
+        value = values[i]
+        if value is not None:
+            fields[key] = value
+    return fields
+
+
+def transform_frame(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Transform a whole DataFrame into documents, equivalent to transform_row() per row."""
+    df = df.reset_index(drop=True)
+    top_level, groups = compile_accessors(list(df.columns))
+    top_level = _parse_columns(df, top_level)
+    groups = [
+        (group.name, _parse_columns(df, accessors), group.required_field)
+        for group, accessors in groups
+    ]
+
+    documents = []
+    for i in range(len(df)):
+        doc = _collect(top_level, i)
+        for name, parsed, required_field in groups:
+            nested = _collect(parsed, i)
+            if nested and (required_field is None or required_field in nested):
+                doc[name] = nested
+        documents.append(doc)
+    return documents
+
+
+def transform_rows(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Per-row transform over positional tuples, with the schema compiled once per frame."""
+    compiled = compile_row_transform(list(df.columns))
+    return [build_document(values, compiled) for values in df.itertuples(index=False, name=None)]
+
+
+TRANSFORM_ENGINES = {
+    "row": transform_rows,
+    "columnar": transform_frame,
+}
+
+
+def read_csv_chunks(csv_file: str, chunk_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield the CSV as DataFrames of at most chunk_size rows (whole file if None)."""
+    if not chunk_size:
+        yield pd.read_csv(csv_file)
+        return
+    with pd.read_csv(csv_file, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def read_arrow_chunks(
+    path: str, input_format: str, chunk_size: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield a Parquet or Arrow IPC/Feather catalog as DataFrames. Files are
+    memory-mapped and only columns known to the cohort schema are decoded;
+    typed integer/boolean/list columns reach the transform without string parsing.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet/Arrow catalogs requires pyarrow (pip install pyarrow)")
+
+    wanted = set(source_columns())
+    if input_format == "parquet":
+        with pq.ParquetFile(path, memory_map=True) as parquet_file:
+            columns = [name for name in parquet_file.schema_arrow.names if name in wanted]
+            if chunk_size:
+                for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+                    yield batch.to_pandas()
+            else:
+                yield parquet_file.read(columns=columns).to_pandas()
+        return
+
+    # Record batches are zero-copy views of the mapping until to_pandas()
+    with pa.memory_map(path) as source, ipc.open_file(source) as reader:
+        columns = [name for name in reader.schema.names if name in wanted]
+        if not chunk_size:
+            yield reader.read_all().select(columns).to_pandas()
+            return
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index).select(columns)
+            for offset in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(offset, chunk_size).to_pandas()
+
+
+def _normalize_value(value: Any, field) -> Any:
+    if _is_missing(value):
+        return None
+    return _ROW_PARSERS[field.parser](value, field.separator)
 
-    # Type of cohort (nested object)
-    doc["type_of_cohort"] = {
-        "case_control": row.get("type_of_cohort_case_control"),
-        "cross_sectional": row.get("type_of_cohort_cross_sectional"),
-        "longitudinal": row.get("type_of_cohort_longitudinal"),
-        "health_records": row.get("type_of_cohort_health_records"),
-        "other": row.get("type_of_cohort_other"),
+
+def _normalize_fields(source: Dict[str, Any], fields) -> Dict[str, Any]:
+    normalized = {}
+    for field in fields:
+        value = _normalize_value(source.get(field.name), field)
+        if value is not None:
+            normalized[field.name] = value
+    return normalized
+
+
+def normalize_document(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate a nested cohort document against the schema: unknown fields are
+    dropped, values are coerced like their CSV counterparts and empty values
+    are removed.
+    """
+    normalized = _normalize_fields(doc, TOP_LEVEL_FIELDS)
+    for group in GROUPS:
+        nested = doc.get(group.name)
+        if not isinstance(nested, dict):
+            continue
+        nested = _normalize_fields(nested, group.fields)
+        if nested and (group.required_field is None or group.required_field in nested):
+            normalized[group.name] = nested
+    return normalized
+
+
+def _batches(items: Iterable[Any], chunk_size: Optional[int]) -> Iterator[List[Any]]:
+    if not chunk_size:
+        yield list(items)
+        return
+    yield from _batched(items, chunk_size)
+
+
+def read_json_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """Decode a JSON array (or single object) of nested cohort documents."""
+    with open(path, "rb") as f:
+        data = json_loads(f.read())
+    yield from ([data] if isinstance(data, dict) else data)
+
+
+def read_ndjson_documents(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Decode an NDJSON stream one line at a time. An undecodable last line
+    without a newline is a record still being written (e.g. a discovery
+    catalog's .partial.ndjson) and is skipped.
+    """
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                document = json_loads(line)
+            except ValueError:
+                if line.endswith(b"\n"):
+                    raise
+                print(f"⚠️  Skipping incomplete last line of {path}")
+                return
+            yield document
+
+
+def detect_format(path: str) -> str:
+    return INPUT_FORMATS.get(os.path.splitext(path)[1].lower(), "csv")
+
+
+def read_document_batches(
+    path: str,
+    input_format: str = "auto",
+    chunk_size: Optional[int] = None,
+    engine: str = "columnar",
+    metrics: Optional[ImportMetrics] = None,
+    skip_chunks: int = 0,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Yield (records read, documents) per chunk of chunk_size records (whole
+    file if None). Tabular rows (CSV, Parquet, Arrow) go through a transform
+    engine; JSON and NDJSON documents are already nested and are only normalized.
+    With metrics, reading is timed as the 'parse' stage and building
+    documents as the 'transform' stage. The first skip_chunks chunks are read
+    but not transformed (resuming after a checkpoint).
+    """
+    def timed(stage, items=0):
+        return metrics.stage(stage, items) if metrics else nullcontext()
+
+    if input_format == "auto":
+        input_format = detect_format(path)
+    if input_format in ("csv", "parquet", "arrow"):
+        frames = (
+            read_csv_chunks(path, chunk_size)
+            if input_format == "csv"
+            else read_arrow_chunks(path, input_format, chunk_size)
+        )
+        if metrics:
+            frames = metrics.timed("parse", frames)
+        for df in itertools.islice(frames, skip_chunks, None):
+            with timed("transform", len(df)):
+                documents = TRANSFORM_ENGINES[engine](df)
+            yield len(df), documents
+        return
+    reader = read_ndjson_documents if input_format == "ndjson" else read_json_documents
+    batches = _batches(reader(path), chunk_size)
+    if metrics:
+        batches = metrics.timed("parse", batches)
+    for batch in itertools.islice(batches, skip_chunks, None):
+        with timed("transform", len(batch)):
+            documents = [normalize_document(doc) for doc in batch]
+        yield len(batch), documents
+
+
+def expand_inputs(paths: List[str]) -> List[str]:
+    """
+    Catalog files named by paths: plain files are kept as given, glob patterns
+    (** recurses) and directories are expanded to files with a known catalog
+    extension. Checkpoint and dead-letter files written by this importer are skipped.
+    """
+    files: Dict[str, None] = {}
+    for path in paths:
+        if os.path.isdir(path):
+            matches = [os.path.join(path, name) for name in os.listdir(path)]
+        elif glob.has_magic(path):
+            matches = glob.glob(path, recursive=True)
+        else:
+            files[path] = None
+            continue
+        for match in sorted(matches):
+            if (
+                os.path.isfile(match)
+                and os.path.splitext(match)[1].lower() in INPUT_FORMATS
+                and not match.endswith((CHECKPOINT_SUFFIX, DEAD_LETTER_SUFFIX))
+            ):
+                files[match] = None
+    return list(files)
+
+
+# Chunk queue of a read_files_parallel() worker process (set by its initializer)
+_chunk_queue = None
+
+
+def _init_chunk_queue(queue):
+    global _chunk_queue
+    _chunk_queue = queue
+
+
+def _transform_file(
+    path: str, input_format: str, chunk_size: Optional[int], engine: str
+) -> Tuple[str, int, int, Dict[str, Any]]:
+    """
+    Process-pool task: read and transform one catalog file, sending each
+    chunk's (rows, documents) to the parent through the chunk queue. Returns
+    (path, rows, documents with a cohort_name, chunks sent, stage timings).
+    """
+    metrics = ImportMetrics()
+    rows = documents = chunks = 0
+    for chunk_rows, chunk_documents in read_document_batches(path, input_format, chunk_size, engine, metrics):
+        rows += chunk_rows
+        documents += sum(1 for doc in chunk_documents if doc.get("cohort_name"))
+        _chunk_queue.put((chunk_rows, chunk_documents))
+        chunks += 1
+    return path, rows, documents, chunks, metrics.report()["stages"]
+
+
+def read_files_parallel(
+    paths: List[str],
+    input_format: str = "auto",
+    chunk_size: Optional[int] = None,
+    engine: str = "columnar",
+    processes: Optional[int] = None,
+    metrics: Optional[ImportMetrics] = None,
+) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """
+    Yield (rows, documents) per chunk of the catalog files, in the order the
+    chunks are ready, while the files are read and transformed in a process
+    pool. Workers block once two chunks per process are waiting, so memory
+    stays bounded by chunk_size rather than file size. Worker stage timings
+    and per-file throughput are added to metrics.
+    """
+    processes = processes or os.cpu_count() or 1
+    queue = multiprocessing.Queue(maxsize=2 * processes)
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_init_chunk_queue, initargs=(queue,)
+    ) as pool:
+        futures = [pool.submit(_transform_file, path, input_format, chunk_size, engine) for path in paths]
+        received = 0
+        try:
+            while True:
+                try:
+                    chunk = queue.get(timeout=0.1)
+                except Empty:
+                    for future in futures:
+                        if future.done():
+                            future.result()  # re-raise a worker's error
+                    # A finished worker's last chunks may still be on their way
+                    if all(future.done() for future in futures) and received == sum(
+                        future.result()[3] for future in futures
+                    ):
+                        break
+                    continue
+                received += 1
+                yield chunk
+        finally:
+            # Stopped early: unblock workers waiting on the full queue
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                with suppress(Empty):
+                    queue.get(timeout=0.1)
+    if metrics:
+        for future in futures:
+            path, rows, documents, _, stages = future.result()
+            metrics.merge_stages(stages)
+            seconds = sum(stage["seconds"] for stage in stages.values())
+            metrics.files.append({
+                "file": path,
+                "rows": rows,
+                "documents": documents,
+                "seconds": round(seconds, 4),
+                "rows_per_sec": round(rows / seconds, 1) if seconds else None,
+            })
+
+
+def generate_actions(
+    batches: Iterable[Tuple[int, List[Dict[str, Any]]]],
+    index: str,
+    checkpoint: Optional[ImportCheckpoint] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Turn document batches lazily into bulk actions, reporting progress per chunk.
+    With a checkpoint, numbering continues after the checkpointed chunk, chunk
+    boundaries are reported to it and documents get an _id from their row position.
+    """
+    first_row = checkpoint.rows if checkpoint else 0
+    first_chunk = checkpoint.chunk + 1 if checkpoint else 1
+    total_rows, total_documents = first_row, 0
+    for number, (rows, documents) in enumerate(batches, first_chunk):
+        documents = [
+            (position, doc)
+            for position, doc in enumerate(documents, total_rows)
+            if doc.get("cohort_name")
+        ]
+        total_rows += rows
+        total_documents += len(documents)
+        print(
+            f"  Chunk {number}: {rows} rows → {len(documents)} documents "
+            f"(total: {total_rows} rows, {total_documents} documents)"
+        )
+        if checkpoint:
+            checkpoint.begin_chunk(number, total_rows)
+        for position, doc in documents:
+            action = {
+                "_index": index,
+                "_source": doc,
+            }
+            if checkpoint:
+                action["_id"] = document_id(checkpoint.row_key(position))
+            yield action
+    if checkpoint:
+        checkpoint.end_input()
+
+
+def _batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _parallel_streaming_bulk(
+    es: Elasticsearch, actions: Iterable[Dict[str, Any]], workers: int, **bulk_options
+) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+    """
+    Like parallel_bulk(), but every worker sends its chunk through streaming_bulk()
+    so 429 rejections are retried with exponential backoff. At most two chunks per
+    worker are in flight, which keeps memory bounded while the CSV is streamed.
+    """
+    def send(batch):
+        return list(streaming_bulk(es, batch, **bulk_options))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _batched(actions, bulk_options["chunk_size"]):
+            pending.append(pool.submit(send, batch))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def index_actions(
+    es: Elasticsearch,
+    actions: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_BULK_DOCS,
+    max_chunk_bytes: int = DEFAULT_BULK_BYTES,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+    max_backoff: float = DEFAULT_MAX_BACKOFF,
+    on_result: Optional[Callable[[bool, Dict[str, Any]], None]] = None,
+) -> Tuple[int, int]:
+    """
+    Stream actions into Elasticsearch; returns (success, failed) counts.
+
+    Documents rejected with 429 (or whole bulk requests answered with 429) are
+    retried up to max_retries times, sleeping initial_backoff * 2**attempt
+    seconds (capped at max_backoff) between attempts. on_result, if given, is
+    called with every (ok, item) result, e.g. to record failures.
+    """
+    bulk_options = {
+        "chunk_size": chunk_size,
+        "max_chunk_bytes": max_chunk_bytes,
+        "max_retries": max_retries,
+        "initial_backoff": initial_backoff,
+        "max_backoff": max_backoff,
+        "raise_on_error": False,
     }
+    if workers > 1:
+        results = _parallel_streaming_bulk(es, actions, workers, **bulk_options)
+    else:
+        results = streaming_bulk(es, actions, **bulk_options)
+    return _count_results(results, on_result)
+
+
+def _count_results(
+    results: Iterable[Tuple[bool, Dict[str, Any]]],
+    on_result: Optional[Callable[[bool, Dict[str, Any]], None]] = None,
+) -> Tuple[int, int]:
+    success = failed = 0
+    for ok, item in results:
+        if on_result:
+            on_result(ok, item)
+        if ok:
+            success += 1
+        else:
+            failed += 1
+    return success, failed
+
+
+async def _async_streaming_bulk(
+    es, actions: Iterable[Dict[str, Any]], in_flight: int, on_result, **bulk_options
+) -> Tuple[int, int]:
+    """
+    Send bulk chunks through async_streaming_bulk() with at most in_flight
+    requests outstanding. The next chunk is pulled from the (synchronous) action
+    stream on a helper thread, so reading and transforming it overlaps with the
+    network I/O of the requests already in flight.
+    """
+    from elasticsearch.helpers import async_streaming_bulk
+
+    async def send(batch):
+        return [result async for result in async_streaming_bulk(es, batch, **bulk_options)]
 
-    # Questionnaire survey data (nested object)
-    doc["questionnaire_survey_data"] = {
-        "diseases": parse_list(row.get("questionnaire_survey_data_diseases")),
-        "healthcare_information": parse_list(row.get("questionnaire_survey_data_healthcare_information")),
-        "lifestyle_and_behaviours": parse_list(row.get("questionnaire_survey_data_lifestyle_and_behaviours")),
-        "medication": parse_list(row.get("questionnaire_survey_data_medication")),
-        "non_pharmacological_interventions": parse_list(row.get("questionnaire_survey_data_non_pharmacological_interventions")),
-        "perception_of_health_and_quality_of_life": parse_list(row.get("questionnaire_survey_data_perception_of_health_and_quality_of_life")),
-        "physical_environment": parse_list(row.get("questionnaire_survey_data_physical_environment")),
-        "physiological_measurements": parse_list(row.get("questionnaire_survey_data_physiological_measurements")),
-        "socio_demographic_and_economic_characteristics": parse_list(row.get("questionnaire_survey_data_socio_demographic_and_economic_characteristics")),
-        "survey_administration": parse_list(row.get("questionnaire_survey_data_survey_administration")),
-        "other_questionnaire_survey_data": parse_list(row.get("questionnaire_survey_data_other_questionnaire_survey_data")),
+    loop = asyncio.get_running_loop()
+    batches = _batched(actions, bulk_options["chunk_size"])
+    success = failed = 0
+    with ThreadPoolExecutor(max_workers=1) as reader:
+        pending = deque()
+        while True:
+            batch = await loop.run_in_executor(reader, next, batches, None)
+            if batch is None:
+                break
+            pending.append(asyncio.ensure_future(send(batch)))
+            while len(pending) >= in_flight:
+                ok, bad = _count_results(await pending.popleft(), on_result)
+                success, failed = success + ok, failed + bad
+        while pending:
+            ok, bad = _count_results(await pending.popleft(), on_result)
+            success, failed = success + ok, failed + bad
+    return success, failed
+
+
+def index_actions_async(
+    hosts: List[str],
+    actions: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_BULK_DOCS,
+    max_chunk_bytes: int = DEFAULT_BULK_BYTES,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+    initial_backoff: float = DEFAULT_INITIAL_BACKOFF,
+    max_backoff: float = DEFAULT_MAX_BACKOFF,
+    on_result: Optional[Callable[[bool, Dict[str, Any]], None]] = None,
+    client_options: Optional[Dict[str, Any]] = None,
+    metrics: Optional[ImportMetrics] = None,
+) -> Tuple[int, int]:
+    """
+    index_actions() on an AsyncElasticsearch client, with workers bulk
+    requests in flight across the pooled connections to all hosts.
+    """
+    try:
+        from elasticsearch import AsyncElasticsearch
+    except ImportError:
+        raise ImportError("--async requires aiohttp (pip install aiohttp)")
+
+    bulk_options = {
+        "chunk_size": chunk_size,
+        "max_chunk_bytes": max_chunk_bytes,
+        "max_retries": max_retries,
+        "initial_backoff": initial_backoff,
+        "max_backoff": max_backoff,
+        "raise_on_error": False,
     }
 
-    # Laboratory measures (nested object)
-    doc["laboratory_measures"] = {
-        "genomic_variables": parse_list(row.get("laboratory_measures_genomic_variables")),
-        "microbiology": parse_list(row.get("laboratory_measures_microbiology")),
+    async def run():
+        es = AsyncElasticsearch(hosts, **(client_options or {}))
+        if metrics:
+            metrics.instrument(es)
+        try:
+            return await _async_streaming_bulk(es, actions, workers, on_result, **bulk_options)
+        finally:
+            await es.close()
+
+    return asyncio.run(run())
+
+
+def document_id(key: Any) -> str:
+    """Stable document _id derived from a cohort key."""
+    return hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Hash of a document's content, independent of key order."""
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def fetch_content_hashes(es: Elasticsearch, index: str) -> Dict[str, Optional[str]]:
+    """Map _id -> stored content hash for every document already in index."""
+    if not es.indices.exists(index=index):
+        return {}
+    return {
+        hit["_id"]: hit.get("_source", {}).get(CONTENT_HASH_FIELD)
+        for hit in scan(es, index=index, _source=[CONTENT_HASH_FIELD], size=5000)
     }
 
-    # Clean up empty values
-    return clean_dict(doc)
 
+def incremental_actions(
+    actions: Iterable[Dict[str, Any]],
+    existing: Dict[str, Optional[str]],
+    id_field: str,
+    stats: Counter,
+    seen: set,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Give every action a stable _id and a content hash, and drop documents whose
+    hash matches the one already indexed. IDs are collected in seen so cohorts
+    missing from the new file can be deleted afterwards.
+    """
+    for action in actions:
+        doc = action["_source"]
+        key = doc.get(id_field)
+        if key is None:
+            stats["no_key"] += 1
+            continue
+        doc_id = document_id(key)
+        seen.add(doc_id)
+        doc[CONTENT_HASH_FIELD] = content_hash(doc)
+        if doc_id in existing:
+            if existing[doc_id] == doc[CONTENT_HASH_FIELD]:
+                stats["unchanged"] += 1
+                continue
+            stats["changed"] += 1
+        else:
+            stats["new"] += 1
+        action["_id"] = doc_id
+        yield action
+
+
+def delete_actions(index: str, doc_ids: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for doc_id in doc_ids:
+        yield {"_op_type": "delete", "_index": index, "_id": doc_id}
+
+
+def generation_index_name(alias: str, now: Optional[datetime] = None) -> str:
+    """Name of a fresh timestamped index generation behind alias."""
+    return f"{alias}_{(now or datetime.now()).strftime(GENERATION_TIMESTAMP_FORMAT)}"
+
+
+def list_generations(es: Elasticsearch, alias: str) -> List[str]:
+    """Existing index generations of alias, oldest first."""
+    pattern = re.compile(rf"{re.escape(alias)}_\d{{8}}T\d{{6}}")
+    indices = es.indices.get(index=f"{alias}_*", ignore_unavailable=True, allow_no_indices=True)
+    return sorted(name for name in indices if pattern.fullmatch(name))
+
+
+def swap_alias(
+    es: Elasticsearch, alias: str, new_index: str, keep_generations: Optional[int] = None
+) -> List[str]:
+    """
+    Atomically point alias at new_index, then optionally delete all but the
+    newest keep_generations older generations. Returns the deleted indices.
+    """
+    actions: List[Dict[str, Any]] = []
+    if es.indices.exists_alias(name=alias):
+        for index in es.indices.get_alias(name=alias):
+            actions.append({"remove": {"index": index, "alias": alias}})
+    elif es.indices.exists(index=alias):
+        # A concrete index still holds the alias name: replace it in the same request
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": new_index, "alias": alias}})
+    es.indices.update_aliases(body={"actions": actions})
+
+    if keep_generations is None:
+        return []
+    older = [index for index in list_generations(es, alias) if index != new_index]
+    stale = older[:max(len(older) - keep_generations, 0)]
+    for index in stale:
+        es.indices.delete(index=index)
+    return stale
+
+
+def begin_bulk_load(es: Elasticsearch, index: str):
+    """Suspend refreshes and replicas on index before loading."""
+    es.indices.put_settings(index=index, body={"index": BULK_LOAD_SETTINGS})
+
+
+def end_bulk_load(
+    es: Elasticsearch,
+    index: str,
+    replicas: int = DEFAULT_REPLICAS,
+    refresh_interval: str = DEFAULT_REFRESH_INTERVAL,
+    force_merge: bool = False,
+):
+    """
+    Make the loaded index searchable, optionally merge it down to one segment
+    while it still has no replicas, then restore the production settings.
+    """
+    es.indices.refresh(index=index)
+    if force_merge:
+        es.indices.forcemerge(index=index, max_num_segments=1, request_timeout=3600)
+    restore_index_settings(es, index, replicas, refresh_interval)
 
-def create_index_mapping():
-    """Define Elasticsearch index mapping."""
+
+def restore_index_settings(
+    es: Elasticsearch,
+    index: str,
+    replicas: int = DEFAULT_REPLICAS,
+    refresh_interval: str = DEFAULT_REFRESH_INTERVAL,
+):
+    """Put back the production replica count and refresh interval."""
+    es.indices.put_settings(
+        index=index,
+        body={"index": {"number_of_replicas": replicas, "refresh_interval": refresh_interval}},
+    )
+
+
+def create_index_mapping(
+    shards: int = DEFAULT_SHARDS,
+    replicas: int = DEFAULT_REPLICAS,
+    refresh_interval: str = DEFAULT_REFRESH_INTERVAL,
+    arranger_metadata: Optional[Dict[str, Any]] = None,
+):
+    """
+    Define Elasticsearch index mapping. With Arranger project metadata the
+    mapping is tuned for the dashboard's facets and default sort (see arranger_mapping).
+    """
+    properties = mapping_properties()
+    settings = {
+        "number_of_shards": shards,
+        "number_of_replicas": replicas,
+        "refresh_interval": refresh_interval,
+    }
+    if arranger_metadata:
+        properties, sort_settings = aggregation_profile(properties, arranger_metadata)
+        settings.update(sort_settings)
     return {
-        "settings": {
-            "number_of_shards": 1,
-            "number_of_replicas": 0,
-        },
+        "settings": settings,
         "mappings": {
             "properties": {
-                "cohort_name": {"type": "keyword"},
-                "countries": {"type": "keyword"},
-                "current_enrollment": {"type": "integer"},
-                "target_enrollment": {"type": "integer"},
-                "enrollment_period": {"type": "keyword"},
-                "pi_lead": {"type": "text"},
-                "website": {"type": "keyword"},
-                "dictionary_harmonized": {"type": "boolean"},
-                "irb_approved_data_sharing": {"type": "keyword"},
-                "available_data_types": {
-                    "properties": {
-                        "biospecimens": {"type": "keyword"},
-                        "genomic_data": {"type": "keyword"},
-                        "genomic_data_wgs": {"type": "keyword"},
-                        "genomic_data_wes": {"type": "keyword"},
-                        "genomic_data_array": {"type": "keyword"},
-                        "genomic_data_other": {"type": "keyword"},
-                        "demographic_data": {"type": "keyword"},
-                        "imaging_data": {"type": "keyword"},
-                        "participants_address_or_geocode_data": {"type": "keyword"},
-                        "electronic_health_record_data": {"type": "keyword"},
-                        "phenotypic_clinical_data": {"type": "keyword"},
-                    }
-                },
-                "biosample": {
-                    "properties": {
-                        "sample_types": {"type": "keyword"},
-                        "biosample_variables": {"type": "keyword"},
-                    }
-                },
-                "cohort_ancestry": {
-                    "properties": {
-                        "asian": {"type": "keyword"},
-                        "black_african_american_or_african": {"type": "keyword"},
-                        "european_or_white": {"type": "keyword"},
-                        "hispanic_latino_or_spanish": {"type": "keyword"},
-                        "middle_eastern_or_north_african": {"type": "keyword"},
-                        "other": {"type": "keyword"},
-                    }
-                },
-                "type_of_cohort": {
-                    "properties": {
-                        "case_control": {"type": "keyword"},
-                        "cross_sectional": {"type": "keyword"},
-                        "longitudinal": {"type": "keyword"},
-                        "health_records": {"type": "keyword"},
-                        "other": {"type": "keyword"},
-                    }
-                },
-                "questionnaire_survey_data": {
-                    "properties": {
-                        "diseases": {"type": "keyword"},
-                        "healthcare_information": {"type": "keyword"},
-                        "lifestyle_and_behaviours": {"type": "keyword"},
-                        "medication": {"type": "keyword"},
-                        "non_pharmacological_interventions": {"type": "keyword"},
-                        "perception_of_health_and_quality_of_life": {"type": "keyword"},
-                        "physical_environment": {"type": "keyword"},
-                        "physiological_measurements": {"type": "keyword"},
-                        "socio_demographic_and_economic_characteristics": {"type": "keyword"},
-                        "survey_administration": {"type": "keyword"},
-                        "other_questionnaire_survey_data": {"type": "keyword"},
-                    }
-                },
-                "laboratory_measures": {
-                    "properties": {
-                        "genomic_variables": {"type": "keyword"},
-                        "microbiology": {"type": "keyword"},
-                    }
-                },
+                **properties,
+                CONTENT_HASH_FIELD: {"type": "keyword", "index": False, "doc_values": False},
             }
         },
     }
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(
         description="Import CSV data into Elasticsearch for biobank dashboard"
     )
-    parser.add_argument("csv_file", help="Path to CSV file")
+    parser.add_argument(
+        "input_file",
+        nargs="+",
+        help="CSV, JSON, NDJSON, Parquet or Arrow/Feather catalog files, glob patterns or directories",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="With several catalog files, processes reading and transforming them (default: CPU count)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["auto", "csv", "json", "ndjson", "parquet", "arrow"],
+        default="auto",
+        help="Catalog file format (default: detect from file extension)",
+    )
     parser.add_argument(
         "--index",
         default=DEFAULT_INDEX,
         help=f"Elasticsearch index name (default: {DEFAULT_INDEX})",
     )
+    parser.add_argument(
+        "--engine",
+        choices=sorted(TRANSFORM_ENGINES),
+        default="columnar",
+        help="Transform engine: vectorized 'columnar' or per-row 'row' (default: columnar)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Stream the catalog in chunks of this many rows (default: read the whole file)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of parallel bulk indexing threads, or in-flight requests with --async (default: 1)",
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Send bulk requests from an asyncio client (implies --http-compress)",
+    )
+    parser.add_argument(
+        "--connections",
+        type=int,
+        default=None,
+        help="Pooled connections per Elasticsearch host (default: max(10, --workers))",
+    )
+    parser.add_argument(
+        "--http-compress",
+        action="store_true",
+        help="Gzip request bodies sent to Elasticsearch",
+    )
+    parser.add_argument(
+        "--sniff",
+        action="store_true",
+        help="Discover all cluster nodes on start and spread requests across them",
+    )
+    parser.add_argument(
+        "--bulk-docs",
+        type=int,
+        default=DEFAULT_BULK_DOCS,
+        help=f"Maximum documents per bulk request (default: {DEFAULT_BULK_DOCS})",
+    )
+    parser.add_argument(
+        "--bulk-bytes",
+        type=int,
+        default=DEFAULT_BULK_BYTES,
+        help=f"Maximum bytes per bulk request (default: {DEFAULT_BULK_BYTES})",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=DEFAULT_MAX_RETRIES,
+        help=f"Retries for documents rejected with 429 (default: {DEFAULT_MAX_RETRIES})",
+    )
+    parser.add_argument(
+        "--initial-backoff",
+        type=float,
+        default=DEFAULT_INITIAL_BACKOFF,
+        help=f"Seconds to wait before the first retry, doubled each attempt (default: {DEFAULT_INITIAL_BACKOFF})",
+    )
+    parser.add_argument(
+        "--max-backoff",
+        type=float,
+        default=DEFAULT_MAX_BACKOFF,
+        help=f"Maximum seconds to wait between retries (default: {DEFAULT_MAX_BACKOFF})",
+    )
+    parser.add_argument(
+        "--alias-swap",
+        action="store_true",
+        help="Load into a new timestamped index and atomically point the --index alias at it",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=None,
+        help="With --alias-swap, delete all but this many previous index generations (default: keep all)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert with stable document IDs and skip cohorts whose content is unchanged",
+    )
+    parser.add_argument(
+        "--id-field",
+        default="cohort_name",
+        help="With --incremental, document field the stable ID is derived from (default: cohort_name)",
+    )
+    parser.add_argument(
+        "--delete-missing",
+        action="store_true",
+        help="With --incremental, delete indexed cohorts that are missing from the file",
+    )
+    parser.add_argument(
+        "--bulk-load",
+        action="store_true",
+        help="Disable refresh and replicas while loading, restore them afterwards",
+    )
+    parser.add_argument(
+        "--force-merge",
+        action="store_true",
+        help="Force-merge the index to a single segment after loading",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=DEFAULT_SHARDS,
+        help=f"Primary shards for newly created indices (default: {DEFAULT_SHARDS})",
+    )
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=DEFAULT_REPLICAS,
+        help=f"Replicas once the import is finished (default: {DEFAULT_REPLICAS})",
+    )
+    parser.add_argument(
+        "--refresh-interval",
+        default=DEFAULT_REFRESH_INTERVAL,
+        help=f"Refresh interval once the import is finished (default: {DEFAULT_REFRESH_INTERVAL})",
+    )
+    parser.add_argument(
+        "--mapping-profile",
+        choices=["default", "arranger"],
+        default="default",
+        help="'arranger' tunes the mapping for the dashboard facets in --arranger-metadata (default: default)",
+    )
+    parser.add_argument(
+        "--arranger-metadata",
+        default=DEFAULT_ARRANGER_METADATA,
+        help="Arranger project metadata used by --mapping-profile arranger (default: src/arrangerMetadata/projectMetadata.json)",
+    )
+    parser.add_argument(
+        "--rollup",
+        action="store_true",
+        help="Also write precomputed dashboard facet counts to a rollup index "
+             "(with --incremental, requires --delete-missing)",
+    )
+    parser.add_argument(
+        "--rollup-index",
+        default=None,
+        help="Rollup index name (default: <index>_rollup)",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        default=None,
+        help="Write stage timings, bulk latency histogram and memory usage as JSON to this file",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=None,
+        help="Write the same metrics in Prometheus text format to this file",
+    )
+    parser.add_argument(
+        "--profile-transform",
+        default=None,
+        help="Run the transform stage under cProfile and dump the stats to this file",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="Record progress after every acknowledged chunk and write rejected documents to a dead-letter file",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted --checkpoint import after its last acknowledged chunk",
+    )
+    parser.add_argument(
+        "--retry-dead-letter",
+        action="store_true",
+        help="Only re-send the documents in the dead-letter file",
+    )
+    parser.add_argument(
+        "--checkpoint-file",
+        default=None,
+        help="Checkpoint file (default: <catalog-file>.checkpoint.json)",
+    )
+    parser.add_argument(
+        "--dead-letter-file",
+        default=None,
+        help="NDJSON file for rejected documents (default: <catalog-file>.dead-letter.ndjson)",
+    )
+    parser.add_argument(
+        "--export-dir",
+        default=None,
+        help="Write compressed _bulk NDJSON files to this directory instead of indexing",
+    )
+    parser.add_argument(
+        "--export-compression",
+        choices=sorted(COMPRESSION_SUFFIXES),
+        default="gzip",
+        help="Compression of exported bulk files (default: gzip)",
+    )
+    parser.add_argument(
+        "--export-docs",
+        type=int,
+        default=DEFAULT_EXPORT_DOCS,
+        help=f"Maximum documents per exported bulk file (default: {DEFAULT_EXPORT_DOCS})",
+    )
+    parser.add_argument(
+        "--export-bytes",
+        type=int,
+        default=DEFAULT_EXPORT_BYTES,
+        help=f"Maximum uncompressed bytes per exported bulk file (default: {DEFAULT_EXPORT_BYTES})",
+    )
+    parser.add_argument(
+        "--load-bulk-files",
+        action="store_true",
+        help="Load an --export-dir directory (given as the input path) with concurrent uploads",
+    )
     parser.add_argument(
         "--force",
         action="store_true",
         help="Force recreate index if it exists",
     )
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    # Validate files exist
+    input_files = args.input_file if args.load_bulk_files else expand_inputs(args.input_file)
+    if not input_files:
+        print(f"❌ No catalog files found in: {' '.join(args.input_file)}")
+        sys.exit(1)
+    for input_file in input_files:
+        if not os.path.exists(input_file):
+            print(f"❌ File not found: {input_file}")
+            sys.exit(1)
+    multi_file = len(input_files) > 1
+    if multi_file:
+        conflicts = [flag for flag, used in (
+            ("--checkpoint", args.checkpoint),
+            ("--resume", args.resume),
+            ("--retry-dead-letter", args.retry_dead_letter),
+            ("--load-bulk-files", args.load_bulk_files),
+        ) if used]
+        if conflicts:
+            print(f"❌ {', '.join(conflicts)} only work with a single catalog file")
+            sys.exit(1)
+    args.input_file = input_files[0]
 
-    # Validate file exists
-    if not os.path.exists(args.csv_file):
-        print(f"❌ File not found: {args.csv_file}")
+    checkpoint_file = args.checkpoint_file or f"{args.input_file}{CHECKPOINT_SUFFIX}"
+    dead_letter_file = args.dead_letter_file or f"{args.input_file}{DEAD_LETTER_SUFFIX}"
+    checkpoint = None
+    if args.rollup and args.incremental and not args.delete_missing:
+        # The rollup counts the file; the index would keep cohorts missing from it
+        print("❌ --rollup with --incremental requires --delete-missing, so the rollup matches the index")
         sys.exit(1)
+    if args.resume:
+        # Resuming only sees the rest of the file
+        conflicts = [flag for flag, used in (
+            ("--force", args.force), ("--delete-missing", args.delete_missing), ("--rollup", args.rollup),
+        ) if used]
+        if conflicts:
+            print(f"❌ --resume cannot be combined with {', '.join(conflicts)}")
+            sys.exit(1)
+        if not os.path.exists(checkpoint_file):
+            print(f"❌ No checkpoint found at {checkpoint_file}")
+            sys.exit(1)
+        try:
+            checkpoint = ImportCheckpoint.resume(checkpoint_file, dead_letter_file, args.input_file)
+        except CheckpointMismatch as e:
+            print(f"❌ Cannot resume: {e}")
+            sys.exit(1)
+        args.chunk_size = checkpoint.state["chunk_size"]
+    elif args.checkpoint and not args.chunk_size:
+        print("⚠️  --checkpoint without --chunk-size only records progress once the whole file is acknowledged")
 
-    print(f"📄 Reading CSV file: {args.csv_file}")
-    print(f"📊 Target index: {args.index}")
-    print(f"🔗 Elasticsearch: {', '.join(ES_HOSTS)}\n")
+    if args.export_dir or args.load_bulk_files:
+        mode = "--export-dir" if args.export_dir else "--load-bulk-files"
+        conflicts = [flag for flag, used in (
+            ("--load-bulk-files", args.export_dir and args.load_bulk_files),
+            ("--incremental", args.incremental),
+            ("--rollup", args.rollup),
+            ("--checkpoint", args.checkpoint),
+            ("--resume", args.resume),
+            ("--retry-dead-letter", args.retry_dead_letter),
+            # Bulk file parts are gzipped already and loaded from a thread pool
+            ("--http-compress", args.load_bulk_files and args.http_compress),
+            ("--async", args.load_bulk_files and args.use_async),
+        ) if used]
+        if conflicts:
+            print(f"❌ {mode} cannot be combined with {', '.join(conflicts)}")
+            sys.exit(1)
+
+    input_format = detect_format(args.input_file) if args.format == "auto" else args.format
+    if args.load_bulk_files:
+        try:
+            manifest = read_manifest(args.input_file)
+        except OSError as e:
+            print(f"❌ Not a bulk file export: {e}")
+            sys.exit(1)
+        print(f"📦 Loading {len(manifest['parts'])} bulk files from: {args.input_file}")
+    elif multi_file:
+        processes = min(len(input_files), args.processes or os.cpu_count() or 1)
+        print(f"📄 Reading {len(input_files)} catalog files with {processes} process(es)")
+    else:
+        print(f"📄 Reading {input_format.upper()} file: {args.input_file}")
+    if args.export_dir:
+        print(f"📦 Exporting bulk files to: {args.export_dir}\n")
+    else:
+        print(f"📊 Target index: {args.index}")
+        print(f"🔗 Elasticsearch: {', '.join(ES_HOSTS)}\n")
+
+    bulk_options = {
+        "workers": args.workers,
+        "chunk_size": args.bulk_docs,
+        "max_chunk_bytes": args.bulk_bytes,
+        "max_retries": args.max_retries,
+        "initial_backoff": args.initial_backoff,
+        "max_backoff": args.max_backoff,
+    }
+
+    metrics = ImportMetrics(profile_transform=bool(args.profile_transform))
+
+    def write_metrics():
+        metrics.finish()
+        print(f"\n⏱️  {metrics.summary()}")
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+            print(f"📄 Metrics written to {args.metrics_json}")
+        if args.metrics_prom:
+            metrics.write_prometheus(args.metrics_prom)
+            print(f"📄 Prometheus metrics written to {args.metrics_prom}")
+        if args.profile_transform:
+            metrics.dump_profile(args.profile_transform)
+            print(f"📄 Transform profile written to {args.profile_transform}")
+
+    arranger_metadata = None
+    if args.mapping_profile == "arranger":
+        try:
+            arranger_metadata = load_arranger_metadata(args.arranger_metadata)
+        except (OSError, ValueError) as e:
+            print(f"❌ Cannot read Arranger metadata: {e}")
+            sys.exit(1)
+        conflicts = display_only_conflicts(arranger_metadata)
+        if conflicts:
+            print(
+                f"⚠️  Display-only fields {', '.join(conflicts)} are faceted or sortable in the "
+                "Arranger metadata; keeping their doc_values"
+            )
+
+    def read_batches(skip_chunks: int = 0):
+        if multi_file:
+            return read_files_parallel(
+                input_files, args.format, args.chunk_size, args.engine, processes, metrics
+            )
+        return read_document_batches(
+            args.input_file, input_format, args.chunk_size, args.engine, metrics, skip_chunks
+        )
+
+    def print_file_throughput():
+        if not metrics.files:
+            return
+        print("\n📁 Per-file throughput (read + transform):")
+        width = max(len(entry["file"]) for entry in metrics.files)
+        for entry in metrics.files:
+            print(
+                f"  {entry['file']:<{width}}  {entry['rows']:>9,} rows → {entry['documents']:>9,} documents"
+                f"  {entry['seconds']:>7.2f}s  {entry['rows_per_sec'] or 0:>10,.0f} rows/sec"
+            )
+        total_rows = sum(entry["rows"] for entry in metrics.files)
+        wall = time.perf_counter() - metrics.started
+        print(
+            f"  Aggregate: {len(metrics.files)} files, {total_rows:,} rows in {wall:.2f}s "
+            f"({total_rows / wall:,.0f} rows/sec end to end)"
+        )
+
+    if args.export_dir:
+        try:
+            writer = BulkFileWriter(
+                args.export_dir, args.export_compression, args.export_docs, args.export_bytes
+            )
+            for action in generate_actions(read_batches(), args.index):
+                writer.add(action)
+            manifest = writer.close(
+                [os.path.abspath(path) for path in input_files] if multi_file
+                else os.path.abspath(args.input_file),
+                create_index_mapping(args.shards, args.replicas, args.refresh_interval, arranger_metadata),
+            )
+        except Exception as e:
+            print(f"❌ Export failed: {e}")
+            sys.exit(1)
+        compressed = sum(part["compressed_bytes"] for part in manifest["parts"])
+        print(
+            f"\n✅ Exported {manifest['documents']} documents to {len(manifest['parts'])} "
+            f"{args.export_compression} bulk files ({compressed:,} bytes)"
+        )
+        print_file_throughput()
+        print("\nTo load them:")
+        print(f"  python scripts/import_csv.py {args.export_dir} --load-bulk-files --index {args.index}")
+        write_metrics()
+        return
 
     # Connect to Elasticsearch
+    client_options = {
+        # One pooled connection per worker thread (or in-flight request) and host
+        "maxsize": args.connections or max(10, args.workers),
+        # Never for --load-bulk-files: its parts are sent gzipped as they are
+        "http_compress": (args.http_compress or args.use_async) and not args.load_bulk_files,
+    }
+    if args.sniff:
+        client_options.update(sniff_on_start=True, sniff_on_connection_fail=True, sniffer_timeout=60)
     try:
-        es = Elasticsearch(ES_HOSTS)
+        es = metrics.instrument(Elasticsearch(ES_HOSTS, **client_options))
         if not es.ping():
             raise Exception("Cannot connect to Elasticsearch")
         print("✅ Connected to Elasticsearch\n")
@@ -277,67 +1507,214 @@ def main():
         print(f"❌ Failed to connect to Elasticsearch: {e}")
         sys.exit(1)
 
-    # Create index if needed
-    try:
-        if es.indices.exists(index=args.index):
-            if args.force:
-                print(f"🗑️  Deleting existing index: {args.index}")
-                es.indices.delete(index=args.index)
+    if args.retry_dead_letter:
+        if not os.path.exists(dead_letter_file):
+            print(f"❌ No dead-letter file found at {dead_letter_file}")
+            sys.exit(1)
+        try:
+            entries = read_dead_letter(dead_letter_file)
+            print(f"🔁 Re-sending {len(entries)} documents from {dead_letter_file}")
+            # Documents failing again replace the dead-letter file once the retry is done
+            retry_file = f"{dead_letter_file}.retry"
+            retry = ImportCheckpoint(None, retry_file, {})
+            retry.begin_chunk(1, len(entries))
+            success, failed = index_actions(
+                es, retry.track(dead_letter_actions(entries)), on_result=retry.acknowledge, **bulk_options
+            )
+            retry.close()
+            if failed:
+                os.replace(retry_file, dead_letter_file)
+                print(f"⚠️  Re-sent {success} documents, {failed} still failing (kept in {dead_letter_file})")
             else:
-                print(f"⚠️  Index '{args.index}' already exists. Use --force to recreate.")
-        
-        if not es.indices.exists(index=args.index):
-            print(f"Creating index: {args.index}")
-            es.indices.create(index=args.index, body=create_index_mapping())
-            print(f"✅ Index created\n")
-    except Exception as e:
-        print(f"❌ Error with index: {e}")
-        sys.exit(1)
+                os.remove(dead_letter_file)
+                print(f"✅ Re-sent {success} documents; dead-letter file removed")
+            indices = sorted({entry["_index"] for entry in entries})
+            if indices:
+                es.indices.refresh(index=",".join(indices))
+            write_metrics()
+        except Exception as e:
+            print(f"❌ Retry failed: {e}")
+            sys.exit(1)
+        return
 
-    # Read CSV
+    # Create index if needed
+    target_index = args.index
+    index_body = create_index_mapping(args.shards, args.replicas, args.refresh_interval, arranger_metadata)
+    if args.load_bulk_files and manifest.get("index_body"):
+        # Mapping the export was built against; settings come from this run
+        index_body["mappings"] = manifest["index_body"]["mappings"]
     try:
-        df = pd.read_csv(args.csv_file)
-        print(f"Parsed {len(df)} rows from CSV\n")
+        if checkpoint:
+            target_index = checkpoint.state["index"]
+            if not es.indices.exists(index=target_index):
+                print(f"❌ Checkpointed index '{target_index}' no longer exists")
+                sys.exit(1)
+            print(
+                f"⏩ Resuming into {target_index} after chunk {checkpoint.chunk} "
+                f"({checkpoint.rows} rows already imported)\n"
+            )
+        elif args.alias_swap:
+            if (
+                es.indices.exists(index=args.index)
+                and not es.indices.exists_alias(name=args.index)
+                and not args.force
+            ):
+                print(f"❌ '{args.index}' is a concrete index. Use --force to replace it with an alias.")
+                sys.exit(1)
+            target_index = generation_index_name(args.index)
+            print(f"Creating index generation: {target_index}")
+            es.indices.create(index=target_index, body=index_body)
+            print("✅ Index created\n")
+        else:
+            if es.indices.exists(index=args.index):
+                if args.force:
+                    print(f"🗑️  Deleting existing index: {args.index}")
+                    es.indices.delete(index=args.index)
+                else:
+                    print(f"⚠️  Index '{args.index}' already exists. Use --force to recreate.")
+
+            if not es.indices.exists(index=args.index):
+                print(f"Creating index: {args.index}")
+                es.indices.create(index=args.index, body=index_body)
+                print("✅ Index created\n")
     except Exception as e:
-        print(f"❌ Error reading CSV: {e}")
+        print(f"❌ Error with index: {e}")
         sys.exit(1)
 
-    # Transform and prepare documents
-    print("Transforming data...")
-    documents = []
-    for idx, row in df.iterrows():
-        doc = transform_row(row)
-        if doc.get("cohort_name"):  # Only include if has a name
-            documents.append({
-                "_index": args.index,
-                "_source": doc,
-            })
+    if args.checkpoint and not checkpoint:
+        checkpoint = ImportCheckpoint.start(
+            checkpoint_file, dead_letter_file, args.input_file, target_index, args.chunk_size
+        )
+        print(f"💾 Checkpointing progress to {checkpoint_file}\n")
 
-    print(f"Prepared {len(documents)} documents\n")
+    if args.bulk_load:
+        try:
+            print("Suspending refresh and replicas for bulk load\n")
+            begin_bulk_load(es, target_index)
+        except Exception as e:
+            print(f"❌ Error with index settings: {e}")
+            sys.exit(1)
 
-    # Bulk import
+    # Read, transform and import chunk by chunk
     try:
-        print("Importing to Elasticsearch...")
-        success, failed = bulk(es, documents, raise_on_error=False, stats_only=True)
-        
+        if args.load_bulk_files:
+            print(f"Loading bulk files into Elasticsearch ({args.workers} worker(s))...")
+            success, failed = load_bulk_files(
+                es, args.input_file, target_index, args.workers,
+                args.max_retries, args.initial_backoff, args.max_backoff,
+            )
+        else:
+            print(
+                f"Importing to Elasticsearch ({args.engine} engine, "
+                + (f"async, {args.workers} request(s) in flight)..." if args.use_async
+                   else f"{args.workers} worker(s))...")
+            )
+            batches = read_batches(skip_chunks=checkpoint.chunk if checkpoint else 0)
+            actions = generate_actions(batches, target_index, checkpoint)
+            if args.rollup:
+                rollup = DashboardRollup()
+                actions = rollup.observe(actions)
+            if args.incremental:
+                existing = fetch_content_hashes(es, target_index)
+                print(f"Found {len(existing)} indexed documents to compare against")
+                stats, seen = Counter(), set()
+                actions = incremental_actions(actions, existing, args.id_field, stats, seen)
+            if checkpoint:
+                actions = checkpoint.track(actions)
+            on_result = checkpoint.acknowledge if checkpoint else None
+            if args.use_async:
+                success, failed = index_actions_async(
+                    ES_HOSTS, actions, on_result=on_result, client_options=client_options,
+                    metrics=metrics, **bulk_options
+                )
+            else:
+                success, failed = index_actions(es, actions, on_result=on_result, **bulk_options)
+        if checkpoint:
+            checkpoint.finish()
+            if checkpoint.dead_letters:
+                print(
+                    f"\n⚠️  {checkpoint.dead_letters} rejected documents written to {dead_letter_file} "
+                    "(re-send with --retry-dead-letter)"
+                )
+        metrics.count("documents_indexed", success)
+        metrics.count("documents_failed", failed)
+        if args.incremental:
+            print(
+                f"\n🔁 {stats['new']} new, {stats['changed']} changed, "
+                f"{stats['unchanged']} unchanged"
+                + (f", {stats['no_key']} without '{args.id_field}'" if stats["no_key"] else "")
+            )
+            missing = [doc_id for doc_id in existing if doc_id not in seen]
+            if missing and args.delete_missing:
+                deleted, delete_failed = index_actions(
+                    es, delete_actions(target_index, missing), **bulk_options
+                )
+                failed += delete_failed
+                print(f"🗑️  Deleted {deleted} cohorts missing from the file")
+            elif missing:
+                print(f"ℹ️  {len(missing)} indexed cohorts are missing from the file (use --delete-missing)")
+        print()
+
+        print_file_throughput()
         if failed > 0:
             print(f"⚠️  Imported {success} documents, {failed} failed")
         else:
             print(f"✅ Successfully imported {success} documents")
         
         # Refresh index
-        es.indices.refresh(index=args.index)
-        
+        with metrics.stage("refresh"):
+            if args.bulk_load or args.force_merge:
+                print("\nRestoring index settings" + (" after force-merge" if args.force_merge else ""))
+                end_bulk_load(es, target_index, args.replicas, args.refresh_interval, args.force_merge)
+            else:
+                es.indices.refresh(index=target_index)
+
+        if args.alias_swap:
+            if failed > 0:
+                print(f"❌ Not switching alias '{args.index}'; partial index left at {target_index}")
+                sys.exit(1)
+            es.cluster.health(index=target_index, wait_for_status="yellow", timeout="60s")
+            pruned = swap_alias(es, args.index, target_index, args.keep_generations)
+            print(f"🔀 Alias '{args.index}' now points to {target_index}")
+            for index in pruned:
+                print(f"🗑️  Deleted old generation: {index}")
+
+        if args.rollup:
+            rollup_index = args.rollup_index or f"{args.index}_rollup"
+            if failed > 0:
+                print(f"⚠️  Skipping rollup index '{rollup_index}' because of failed documents")
+            else:
+                if not es.indices.exists(index=rollup_index):
+                    es.indices.create(index=rollup_index, body=rollup_index_mapping())
+                generated_at = datetime.now().strftime(GENERATION_TIMESTAMP_FORMAT)
+                written, _ = index_actions(es, rollup.actions(rollup_index, generated_at), **bulk_options)
+                es.indices.refresh(index=rollup_index)
+                es.delete_by_query(index=rollup_index, body=stale_rollup_query(generated_at), refresh=True)
+                print(f"📈 Wrote {written} rollup documents to '{rollup_index}'")
+
         # Verify count
         count = es.count(index=args.index)["count"]
         print(f"\n📊 Total documents in index: {count}")
-        
+        write_metrics()
+
         print("\n✨ Import complete!")
         print(f"\nTo view your data:")
         print(f"  curl http://localhost:9200/{args.index}/_search?pretty")
         
     except Exception as e:
         print(f"❌ Import failed: {e}")
+        if checkpoint and not checkpoint.finished:
+            checkpoint.close()
+            print(
+                f"💾 {checkpoint.rows} rows are checkpointed in {checkpoint_file}; "
+                "re-run with --resume to continue"
+            )
+        write_metrics()
+        if args.bulk_load:
+            try:
+                restore_index_settings(es, target_index, args.replicas, args.refresh_interval)
+            except Exception as restore_error:
+                print(f"⚠️  Could not restore settings of {target_index}: {restore_error}")
         sys.exit(1)
 
 
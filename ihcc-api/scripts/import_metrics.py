@@ -0,0 +1,326 @@
+"""
+Stage-level timing and metrics for the cohort importer.
+
+An ImportMetrics instance is threaded through the import pipeline and records,
+per stage (parse, transform, serialize, bulk, refresh), wall time, calls,
+items processed and the process peak RSS seen when the stage finished. Bulk
+round trips are measured at the Elasticsearch transport: request latency
+histogram, bytes sent, HTTP status counts and documents retried after 429s.
+
+The totals are written as a JSON report (write_json) and in the Prometheus
+text exposition format (write_prometheus), e.g. for the node_exporter
+textfile collector. The transform stage can optionally run under cProfile.
+
+Stage times are summed over all calls; with several bulk workers the
+serialize and bulk stages can add up to more than the total wall time.
+"""
+
+import asyncio
+import cProfile
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bounds (seconds) of the bulk request latency histogram buckets
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+PROMETHEUS_PREFIX = "cohort_import"
+
+_END = object()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class StageStats:
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.items = 0
+        self.peak_rss_mb = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seconds": round(self.seconds, 4),
+            "calls": self.calls,
+            "items": self.items,
+            "items_per_sec": round(self.items / self.seconds, 1) if self.items and self.seconds else None,
+            "peak_rss_mb": round(self.peak_rss_mb, 1) if self.peak_rss_mb else None,
+        }
+
+
+class TimedSerializer:
+    """Serializer proxy timing dumps() calls as the 'serialize' stage."""
+
+    def __init__(self, serializer, metrics: "ImportMetrics"):
+        self._serializer = serializer
+        self._metrics = metrics
+        self.mimetype = serializer.mimetype
+
+    def dumps(self, data: Any) -> str:
+        start = time.perf_counter()
+        result = self._serializer.dumps(data)
+        self._metrics.record("serialize", time.perf_counter() - start, 1)
+        return result
+
+    def loads(self, data: Any) -> Any:
+        return self._serializer.loads(data)
+
+
+class ImportMetrics:
+    """Thread-safe collector for one import run."""
+
+    def __init__(self, profile_transform: bool = False):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.stages: Dict[str, StageStats] = defaultdict(StageStats)
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.bulk_requests = 0
+        self.bulk_bytes = 0
+        self.bulk_seconds = 0.0
+        self.bulk_status: Counter = Counter()
+        self.retried_documents = 0
+        self.counters: Counter = Counter()
+        self.files: List[Dict[str, Any]] = []
+        self.profiler = cProfile.Profile() if profile_transform else None
+
+    def record(self, stage: str, seconds: float, items: int = 0):
+        with self.lock:
+            stats = self.stages[stage]
+            stats.seconds += seconds
+            stats.calls += 1
+            stats.items += items
+
+    def _mark_peak(self, stage: str):
+        rss = peak_rss_mb()
+        with self.lock:
+            stats = self.stages[stage]
+            stats.peak_rss_mb = max(stats.peak_rss_mb, rss)
+
+    @contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time a block as one call of the named stage."""
+        profile = self.profiler is not None and name == "transform"
+        if profile:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile:
+                self.profiler.disable()
+            self.record(name, elapsed, items)
+            self._mark_peak(name)
+
+    def timed(self, name: str, iterable: Iterable[Any], size=len) -> Iterator[Any]:
+        """Yield from iterable, timing each next() as one call of the named stage."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            item = next(iterator, _END)
+            elapsed = time.perf_counter() - start
+            if item is _END:
+                return
+            self.record(name, elapsed, size(item))
+            self._mark_peak(name)
+            yield item
+
+    def merge_stages(self, stages: Dict[str, Dict[str, Any]]):
+        """Add stage totals reported by another process, e.g. a transform worker."""
+        with self.lock:
+            for name, other in stages.items():
+                stats = self.stages[name]
+                stats.seconds += other["seconds"]
+                stats.calls += other["calls"]
+                stats.items += other["items"]
+                stats.peak_rss_mb = max(stats.peak_rss_mb, other["peak_rss_mb"] or 0)
+
+    def count(self, name: str, value: int = 1):
+        with self.lock:
+            self.counters[name] += value
+
+    def record_request(self, seconds: float, size: int, status: Any, documents: int = 0, retried: int = 0):
+        with self.lock:
+            self.bulk_requests += 1
+            self.bulk_bytes += size
+            self.bulk_seconds += seconds
+            self.bulk_status[str(status)] += 1
+            self.retried_documents += retried
+            bucket = next(
+                (i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                len(LATENCY_BUCKETS),
+            )
+            self.latency_buckets[bucket] += 1
+        self.record("bulk", seconds, documents)
+        self._mark_peak("bulk")
+
+    def _bulk_request(self, headers, body) -> Tuple[int, int]:
+        """(bytes, documents) of a _bulk request body."""
+        size = len(body.encode("utf-8") if isinstance(body, str) else body or b"")
+        # Action and source lines (deletes have no source line, so this is approximate)
+        if (headers or {}).get("Content-Encoding") == "gzip":
+            return size, 0
+        return size, (body.count("\n") if isinstance(body, str) else body.count(b"\n")) // 2
+
+    def _bulk_response(self, start: float, size: int, documents: int, response=None, error=None):
+        if error is not None:
+            status = getattr(error, "status_code", "error")
+            # A whole request rejected with 429 is resent by streaming_bulk
+            retried = documents if status == 429 else 0
+        else:
+            status = 200
+            retried = sum(
+                1
+                for item in response.get("items", [])
+                if next(iter(item.values()), {}).get("status") == 429
+            )
+        self.record_request(time.perf_counter() - start, size, status, documents, retried)
+
+    def instrument(self, es):
+        """
+        Hook an Elasticsearch client (sync or async): time the serializer used
+        by the bulk helpers and every _bulk round trip made through its transport.
+        """
+        transport = es.transport
+        if not isinstance(transport.serializer, TimedSerializer):
+            transport.serializer = TimedSerializer(transport.serializer, self)
+        perform_request = transport.perform_request
+
+        def timed_perform_request(method, url, headers=None, params=None, body=None):
+            if not url.endswith("/_bulk"):
+                return perform_request(method, url, headers=headers, params=params, body=body)
+            size, documents = self._bulk_request(headers, body)
+            start = time.perf_counter()
+            try:
+                response = perform_request(method, url, headers=headers, params=params, body=body)
+            except Exception as e:
+                self._bulk_response(start, size, documents, error=e)
+                raise
+            self._bulk_response(start, size, documents, response)
+            return response
+
+        async def timed_perform_request_async(method, url, headers=None, params=None, body=None):
+            if not url.endswith("/_bulk"):
+                return await perform_request(method, url, headers=headers, params=params, body=body)
+            size, documents = self._bulk_request(headers, body)
+            start = time.perf_counter()
+            try:
+                response = await perform_request(method, url, headers=headers, params=params, body=body)
+            except Exception as e:
+                self._bulk_response(start, size, documents, error=e)
+                raise
+            self._bulk_response(start, size, documents, response)
+            return response
+
+        if asyncio.iscoroutinefunction(perform_request):
+            transport.perform_request = timed_perform_request_async
+        else:
+            transport.perform_request = timed_perform_request
+        return es
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        end = self.finished or time.perf_counter()
+        wall = end - self.started
+        with self.lock:
+            rows = self.stages["parse"].items if "parse" in self.stages else 0
+            cumulative, histogram = 0, []
+            for bound, count in zip(LATENCY_BUCKETS + ["+Inf"], self.latency_buckets):
+                cumulative += count
+                histogram.append({"le": bound, "count": cumulative})
+            return {
+                "wall_seconds": round(wall, 4),
+                "rows": rows,
+                "rows_per_sec": round(rows / wall, 1) if wall else None,
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+                "bulk": {
+                    "requests": self.bulk_requests,
+                    "bytes_sent": self.bulk_bytes,
+                    "seconds": round(self.bulk_seconds, 4),
+                    "status": dict(self.bulk_status),
+                    "retried_documents": self.retried_documents,
+                    "latency_histogram": histogram,
+                },
+                "counters": dict(self.counters),
+                **({"files": list(self.files)} if self.files else {}),
+            }
+
+    def summary(self) -> str:
+        """One-line stage timing summary for the console."""
+        report = self.report()
+        parts = [f"{name} {stats['seconds']:.2f}s" for name, stats in report["stages"].items()]
+        return (
+            " · ".join(parts)
+            + f" | {report['rows_per_sec'] or 0:,.0f} rows/sec, peak RSS {report['peak_rss_mb']:.0f} MB"
+        )
+
+    def write_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def write_prometheus(self, path: str):
+        """Write the report in Prometheus text format, atomically for textfile collectors."""
+        report = self.report()
+        p = PROMETHEUS_PREFIX
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples):
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{p}_{name}{suffix} {value}")
+
+        stages = report["stages"]
+        metric("wall_seconds", "gauge", "Wall time of the import run.", [({}, report["wall_seconds"])])
+        metric("rows_total", "counter", "Catalog rows read.", [({}, report["rows"])])
+        metric("peak_rss_megabytes", "gauge", "Peak resident set size of the importer.",
+               [({}, report["peak_rss_mb"])])
+        metric("stage_seconds", "gauge", "Time spent per pipeline stage.",
+               [({"stage": name}, s["seconds"]) for name, s in stages.items()])
+        metric("stage_items_total", "counter", "Items processed per pipeline stage.",
+               [({"stage": name}, s["items"]) for name, s in stages.items()])
+        metric("stage_peak_rss_megabytes", "gauge", "Peak RSS observed at the end of each stage.",
+               [({"stage": name}, s["peak_rss_mb"]) for name, s in stages.items() if s["peak_rss_mb"]])
+
+        bulk = report["bulk"]
+        metric("bulk_bytes_sent_total", "counter", "Bytes sent in bulk request bodies.",
+               [({}, bulk["bytes_sent"])])
+        metric("bulk_requests_total", "counter", "Bulk requests by HTTP status.",
+               [({"status": status}, count) for status, count in bulk["status"].items()])
+        metric("bulk_retried_documents_total", "counter", "Documents resent after 429 rejections.",
+               [({}, bulk["retried_documents"])])
+        name = f"{p}_bulk_request_duration_seconds"
+        lines.append(f"# HELP {name} Bulk request round-trip latency.")
+        lines.append(f"# TYPE {name} histogram")
+        for bucket in bulk["latency_histogram"]:
+            lines.append(f'{name}_bucket{{le="{bucket["le"]}"}} {bucket["count"]}')
+        lines.append(f"{name}_sum {bulk['seconds']}")
+        lines.append(f"{name}_count {bulk['requests']}")
+        for counter, value in report["counters"].items():
+            metric(f"{counter}_total", "counter", f"Importer counter '{counter}'.", [({}, value)])
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+    def dump_profile(self, path: str):
+        if self.profiler is not None:
+            self.profiler.dump_stats(path)